@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from .timing import timed
+
+# gunicorn workers are separate processes, so in-process caches would be
+# duplicated per worker. Entries live in one SQLite file on the pod instead,
+# shared by every worker (and thread) without an external service.
+
+_local = threading.local()
+
+# Reads record their access time at most this often, so hits rarely need the write lock
+_ACCESS_RESOLUTION = 5.0
+
+
+def cache_enabled() -> bool:
+    return os.getenv("CACHE_ENABLED", "1").strip() not in ("0", "false", "False", "")
+
+
+def _cache_path() -> str:
+    return os.getenv("CACHE_PATH", "/tmp/web-s3-cleaner-cache.sqlite3")
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_ttl() -> int:
+    """TTL in seconds for listings, counts and retention plans."""
+    return _int_env("CACHE_TTL_SECONDS", 30)
+
+
+def route_ttl() -> int:
+    """TTL in seconds for bucket -> endpoint routing."""
+    return _int_env("CACHE_ROUTE_TTL_SECONDS", 600)
+
+
+def _max_bytes() -> int:
+    return _int_env("CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+
+def _conn() -> sqlite3.Connection:
+    """Connection for the current thread, reopened after a fork."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(_cache_path(), timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " bucket TEXT NOT NULL,"
+            " prefix TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_bucket ON entries (bucket, prefix)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def get(key: str) -> Optional[Any]:
+    """Return the cached value for key, or None when missing or expired."""
+    if not cache_enabled():
+        return None
+    try:
+        with timed("cache"):
+            conn = _conn()
+            now = time.time()
+            row = conn.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            if now - row[2] > _ACCESS_RESOLUTION:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+    except (sqlite3.Error, ValueError):
+        return None
+
+
+def put(key: str, value: Any, bucket: str = "", prefix: str = "", ttl: Optional[int] = None) -> None:
+    """Store a JSON-serialisable value.
+
+    bucket/prefix tag the entry for invalidate(); entries tagged with an empty
+    bucket (e.g. routing) are never invalidated by deletions.
+    """
+    if not cache_enabled():
+        return
+    try:
+        data = json.dumps(value, separators=(",", ":"))
+        limit = _max_bytes()
+        # A single huge entry would evict everything else
+        if len(data) > limit // 4:
+            return
+        conn = _conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, bucket, prefix, value, size, expires, accessed)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, bucket, prefix or "", data, len(data), now + (ttl if ttl is not None else default_ttl()), now),
+        )
+        _evict(conn, limit)
+    except (sqlite3.Error, TypeError, ValueError):
+        pass
+
+
+def add(key: str, value: Any, ttl: int) -> bool:
+    """Store value only if key is absent or expired; True when stored.
+
+    Usable as a cross-worker lock with a TTL.
+    """
+    if not cache_enabled():
+        return True
+    try:
+        conn = _conn()
+        now = time.time()
+        conn.execute("DELETE FROM entries WHERE key = ? AND expires < ?", (key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO entries (key, bucket, prefix, value, size, expires, accessed)"
+            " VALUES (?, '', '', ?, 0, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        return cur.rowcount == 1
+    except sqlite3.Error:
+        return True
+
+
+def touch(key: str, ttl: int) -> None:
+    """Push the expiry of an existing entry (e.g. a lock from add()) to ttl from now."""
+    if not cache_enabled():
+        return
+    try:
+        _conn().execute("UPDATE entries SET expires = ? WHERE key = ?", (time.time() + ttl, key))
+    except sqlite3.Error:
+        pass
+
+
+def delete(key: str) -> None:
+    if not cache_enabled():
+        return
+    try:
+        _conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+    except sqlite3.Error:
+        pass
+
+
+def _evict(conn: sqlite3.Connection, limit: int) -> None:
+    """Drop expired entries, then least recently used ones, until under limit."""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= limit:
+        return
+    conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= limit:
+        return
+    victims = []
+    # Zero-size rows are locks from add(): dropping them frees nothing
+    for key, size in conn.execute("SELECT key, size FROM entries WHERE size > 0 ORDER BY accessed"):
+        victims.append((key,))
+        total -= size
+        if total <= limit:
+            break
+    conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+
+def invalidate(bucket: str, paths: Iterable[str]) -> None:
+    """Drop entries of bucket whose prefix contains, or lies under, any path.
+
+    Called from the delete functions with the deleted prefixes (or the parent
+    folders of deleted keys); an empty path drops every entry of the bucket.
+    """
+    if not cache_enabled():
+        return
+    try:
+        conn = _conn()
+        for path in {p or "" for p in paths}:
+            conn.execute(
+                "DELETE FROM entries WHERE bucket = ?"
+                " AND (substr(?, 1, length(prefix)) = prefix OR substr(prefix, 1, length(?)) = ?)",
+                (bucket, path, path, path),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def parent_prefixes(keys: Iterable[str]) -> set:
+    """Folder prefixes holding the given keys ('' for keys at the bucket root)."""
+    return {k.rsplit("/", 1)[0] + "/" if "/" in k else "" for k in keys}
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import cache
+from .s3_utils import bucket_overview, get_allowed_buckets
+
+# Landing page overview. Per-bucket stats are computed on a small thread pool
+# and stored in the shared cache, so the endpoint only ever reads: missing or
+# stale buckets are queued for a background refresh and returned as they are
+# (or as "pending") right away. A cache-based lock keeps gunicorn workers from
+# scanning the same bucket twice; a daemon thread re-queues stale buckets.
+
+# Kept (and served as stale) for a day; refreshed after OVERVIEW_REFRESH_SECONDS
+_MAX_AGE = 24 * 3600
+# The scanning worker keeps its lock alive while the scan makes progress; one
+# that dies or stalls mid-scan releases it this long after its last refresh
+_LOCK_TTL = 5 * 60
+_LOCK_REFRESH = 60
+
+_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+_scheduled: set = set()
+_loop_started = False
+# Fallback store when the shared cache is disabled (per process)
+_local_results: Dict[str, Dict] = {}
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def refresh_seconds() -> int:
+    return max(30, _int_env("OVERVIEW_REFRESH_SECONDS", 900))
+
+
+def _key(bucket: str) -> str:
+    return f"overview:{bucket}"
+
+
+def _fresh_key(bucket: str) -> str:
+    return f"overview-fresh:{bucket}"
+
+
+def _load(bucket: str) -> Optional[Dict]:
+    if cache.cache_enabled():
+        entry = cache.get(_key(bucket))
+        if entry is not None and cache.get(_fresh_key(bucket)) is None:
+            entry["stale"] = True  # deletions since the last scan
+        return entry
+    entry = _local_results.get(bucket)
+    return dict(entry) if entry else None
+
+
+def _store(bucket: str, stats: Dict) -> None:
+    if cache.cache_enabled():
+        # The stats themselves are untagged, so deletions never drop them; only the
+        # marker is tagged with the bucket, and its absence queues a rescan while
+        # the old stats keep being served
+        cache.put(_key(bucket), stats, ttl=_MAX_AGE)
+        cache.put(_fresh_key(bucket), True, bucket=bucket, ttl=_MAX_AGE)
+    else:
+        _local_results[bucket] = stats
+
+
+def _refresh(bucket: str) -> None:
+    lock_key = f"overview-lock:{bucket}"
+    try:
+        if not cache.add(lock_key, os.getpid(), ttl=_LOCK_TTL):
+            return  # another worker is already scanning this bucket
+        refreshed = [time.monotonic()]
+
+        def progress(objects: int) -> None:
+            # Multi-million-object buckets take longer to scan than the lock TTL
+            if time.monotonic() - refreshed[0] >= _LOCK_REFRESH:
+                cache.touch(lock_key, _LOCK_TTL)
+                refreshed[0] = time.monotonic()
+
+        try:
+            try:
+                stats = bucket_overview(bucket, progress)
+                stats["status"] = "ok"
+            except Exception as e:
+                stats = {"bucket": bucket, "status": "error", "error": str(e)}
+            stats["updated_at"] = time.time()
+            _store(bucket, stats)
+        finally:
+            cache.delete(lock_key)
+    finally:
+        with _lock:
+            _scheduled.discard(bucket)
+
+
+def _schedule(buckets: List[str]) -> None:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, _int_env("OVERVIEW_WORKERS", 4)), thread_name_prefix="overview"
+            )
+        for b in buckets:
+            if b not in _scheduled:
+                _scheduled.add(b)
+                _pool.submit(_refresh, b)
+
+
+def _refresh_loop() -> None:
+    while True:
+        time.sleep(refresh_seconds())
+        try:
+            get_overview()
+        except Exception:
+            pass
+
+
+def _ensure_refresh_loop() -> None:
+    # Started lazily, i.e. inside each gunicorn worker after the fork
+    global _loop_started
+    with _lock:
+        if _loop_started:
+            return
+        _loop_started = True
+    threading.Thread(target=_refresh_loop, name="overview-refresh", daemon=True).start()
+
+
+def get_overview(refresh: bool = False) -> Dict:
+    """Cached stats for every allowed bucket, queueing missing or stale ones.
+
+    Buckets without stats yet come back as {"bucket", "status": "pending"};
+    "refreshing" marks entries whose recomputation has been queued.
+    """
+    _ensure_refresh_loop()
+    now = time.time()
+    max_age = refresh_seconds()
+    buckets: List[Dict] = []
+    due: List[str] = []
+    for b in get_allowed_buckets():
+        entry = _load(b)
+        if entry is None:
+            entry = {"bucket": b, "status": "pending"}
+            due.append(b)
+        elif refresh or entry.pop("stale", False) or now - entry.get("updated_at", 0) >= max_age:
+            due.append(b)
+        entry["refreshing"] = b in due
+        buckets.append(entry)
+    if due:
+        _schedule(due)
+    return {"buckets": buckets, "refresh_seconds": max_age}
@@ -0,0 +1,261 @@
+import io
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+try:  # optional: vectorised path
+    import numpy as np
+except ImportError:  # pragma: no cover - pure-Python fallback below
+    np = None
+
+# Retention engine for smart cleanup. Listings are held as flat arrays
+# (epoch microseconds, sizes, packed keys) and every timestamp is reduced to
+# one integer slot code, code = slot * 8 + tier, so "newest per slot" is a
+# group-by over integers. Slots are computed in UTC, like S3 LastModified and
+# the parsed folder timestamps; labels are only formatted per distinct slot.
+
+RETENTION_POLICY = {
+    "hourly": "< 7 days",
+    "daily": "7–30 days",
+    "weekly": "30–90 days",
+    "biweekly": "90–365 days",
+    "monthly": ">= 365 days",
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_DATE = date(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+_HOUR_US = 3600 * 10**6
+_DAY_US = 86400 * 10**6
+# Upper age bound (exclusive) of the hourly, daily, weekly and biweekly tiers
+_TIER_LIMITS_US = (7 * _DAY_US, 30 * _DAY_US, 90 * _DAY_US, 365 * _DAY_US)
+
+
+def to_us(dt: datetime) -> int:
+    """Epoch microseconds of an aware datetime (exact, no float rounding)."""
+    return (dt - _EPOCH) // _ONE_US
+
+
+def from_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(us))
+
+
+@lru_cache(maxsize=1)
+def _time_of_day_table() -> List[str]:
+    return [f"T{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}+00:00" for s in range(86400)]
+
+
+def iso_seconds(ts: Sequence[int], indices: Sequence[int]) -> List[str]:
+    """from_us(ts[i]).replace(microsecond=0).isoformat() for each index, built from
+    one date string per distinct day and a table of the 86400 times of day."""
+    if np is not None:
+        secs = _as_int64(ts)[np.asarray(indices, dtype=np.int64)] // 10**6
+        days, tod = (secs // 86400).tolist(), (secs % 86400).tolist()
+    else:
+        secs = [ts[i] // 10**6 for i in indices]
+        days, tod = [s // 86400 for s in secs], [s % 86400 for s in secs]
+    dates = {d: (_EPOCH_DATE + timedelta(days=d)).isoformat() for d in set(days)}
+    table = _time_of_day_table()
+    return [dates[d] + table[t] for d, t in zip(days, tod)]
+
+
+class ObjectBatch:
+    """Listing rows as parallel arrays: keys packed into one string with offsets,
+    last-modified as epoch microseconds and sizes."""
+
+    def __init__(self) -> None:
+        self._buf = io.StringIO()
+        self._blob = ""
+        self._end = 0
+        self.offsets = array("q", [0])
+        self.ts = array("q")
+        self.sizes = array("q")
+
+    def append(self, key: str, last_modified: datetime, size: int) -> None:
+        self._buf.write(key)
+        self._end += len(key)
+        self.offsets.append(self._end)
+        self.ts.append(to_us(last_modified))
+        self.sizes.append(size or 0)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def _text(self) -> str:
+        if len(self._blob) != self._end:
+            self._blob = self._buf.getvalue()
+        return self._blob
+
+    def key(self, i: int) -> str:
+        return self._text()[self.offsets[i] : self.offsets[i + 1]]
+
+    def keys(self, indices: Sequence[int]) -> List[str]:
+        blob, off = self._text(), self.offsets
+        return [blob[off[i] : off[i + 1]] for i in indices]
+
+
+def _as_int64(values: Sequence[int]):
+    if isinstance(values, array) and values.typecode == "q":
+        return np.frombuffer(values, dtype=np.int64)
+    return np.asarray(values, dtype=np.int64)
+
+
+@lru_cache(maxsize=65536)
+def _day_codes(day: int) -> Tuple[int, int, int]:
+    """Weekly, biweekly and monthly slots of a day number (days since 1970-01-01)."""
+    d = _EPOCH_DATE + timedelta(days=day)
+    iso_year, iso_week, _ = d.isocalendar()
+    return (
+        iso_year * 64 + iso_week,
+        iso_year * 64 + (iso_week - 1) // 2 + 1,
+        (d.year - 1970) * 12 + d.month - 1,
+    )
+
+
+def _codes_py(ts: Sequence[int], now_us: int) -> array:
+    l0, l1, l2, l3 = _TIER_LIMITS_US
+    codes = array("q")
+    for t in ts:
+        age = now_us - t
+        if age < l0:
+            codes.append((t // _HOUR_US) * 8)
+        elif age < l1:
+            codes.append((t // _DAY_US) * 8 + 1)
+        elif age < l2:
+            codes.append(_day_codes(t // _DAY_US)[0] * 8 + 2)
+        elif age < l3:
+            codes.append(_day_codes(t // _DAY_US)[1] * 8 + 3)
+        else:
+            codes.append(_day_codes(t // _DAY_US)[2] * 8 + 4)
+    return codes
+
+
+def _codes_np(ts, now_us: int):
+    ts = _as_int64(ts)
+    tiers = np.searchsorted(np.array(_TIER_LIMITS_US, dtype=np.int64), now_us - ts, side="right")
+    slots = ts // _HOUR_US
+    days = ts // _DAY_US
+    daily = tiers == 1
+    slots[daily] = days[daily]
+    older = tiers >= 2
+    if older.any():
+        d = days[older]
+        # ISO year/week follow the Thursday of the same Monday-based week
+        thursday = d - (d + 3) % 7 + 3
+        iso_year = thursday.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970
+        jan1 = (iso_year - 1970).astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+        iso_week = (thursday - jan1) // 7 + 1
+        months = d.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        t = tiers[older]
+        slots[older] = np.where(
+            t == 2,
+            iso_year * 64 + iso_week,
+            np.where(t == 3, iso_year * 64 + (iso_week - 1) // 2 + 1, months),
+        )
+    return slots * 8 + tiers
+
+
+def slot_codes(ts: Sequence[int], now_us: int):
+    """Integer code (slot * 8 + tier) per epoch-microsecond timestamp."""
+    if np is not None:
+        return _codes_np(ts, now_us)
+    return _codes_py(ts, now_us)
+
+
+def slot_pieces(t0: int, t1: int, now_us: int, cuts: Sequence[int] = ()) -> List[Tuple[int, int, int]]:
+    """Split the interval [t0, t1) of epoch microseconds into (code, start, end) pieces.
+
+    Cuts fall on tier limits, on hour (hourly tier) or day boundaries and on
+    the extra cuts given; every slot is a whole number of hours or days, so
+    each piece lies in one slot.
+    """
+    # Tier limits are exclusive: the younger tier starts one microsecond after now - limit
+    starts = [now_us - limit + 1 for limit in _TIER_LIMITS_US]
+    points = {t0, t1}
+    points.update(c for c in list(cuts) + starts if t0 < c < t1)
+    points.update(range(-(-max(t0, starts[0]) // _HOUR_US) * _HOUR_US, t1, _HOUR_US))
+    points.update(range(-(-t0 // _DAY_US) * _DAY_US, min(t1, starts[0]), _DAY_US))
+    points = sorted(points)
+    codes = slot_codes(array("q", points[:-1]), now_us)
+    return [(int(code), a, b) for code, a, b in zip(codes, points, points[1:])]
+
+
+def newest_per_slot(ts: Sequence[int], codes: Sequence[int]):
+    """Keep mask with the newest timestamp per code; ties keep the lowest index."""
+    if np is not None:
+        ts = _as_int64(ts)
+        codes = np.asarray(codes, dtype=np.int64)
+        # lexsort is stable: by code, then newest first, then input order
+        order = np.lexsort((-ts, codes))
+        grouped = codes[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = grouped[1:] != grouped[:-1]
+        keep = np.zeros(len(order), dtype=bool)
+        keep[order[first]] = True
+        return keep
+    best = {}
+    for i, (c, t) in enumerate(zip(codes, ts)):
+        b = best.get(c)
+        if b is None or t > ts[b]:
+            best[c] = i
+    keep = bytearray(len(ts))
+    for i in best.values():
+        keep[i] = 1
+    return keep
+
+
+def time_order(ts: Sequence[int]) -> Sequence[int]:
+    """Indices sorting ts ascending (stable)."""
+    if np is not None:
+        return np.argsort(_as_int64(ts), kind="stable")
+    return sorted(range(len(ts)), key=ts.__getitem__)
+
+
+@lru_cache(maxsize=65536)
+def slot_label(code: int) -> Tuple[str, str]:
+    """(tier, bucket_id) for a slot code, e.g. ("daily", "2024-05-01")."""
+    slot, tier = code >> 3, code & 7
+    if tier == 0:
+        return "hourly", (_EPOCH + timedelta(hours=slot)).strftime("%Y-%m-%dT%H:00Z")
+    if tier == 1:
+        return "daily", (_EPOCH_DATE + timedelta(days=slot)).strftime("%Y-%m-%d")
+    if tier == 2:
+        return "weekly", f"{slot // 64}-W{slot % 64:02d}"
+    if tier == 3:
+        return "biweekly", f"{slot // 64}-BW{slot % 64:02d}"
+    return "monthly", date(1970 + slot // 12, slot % 12 + 1, 1).strftime("%Y-%m")
+
+
+class RetentionPlan:
+    """Slot codes and keep mask for a batch of timestamps."""
+
+    def __init__(self, ts: Sequence[int], now: datetime) -> None:
+        self.codes = slot_codes(ts, to_us(now))
+        self.keep = newest_per_slot(ts, self.codes)
+        self.kept = int(sum(self.keep)) if np is None else int(self.keep.sum())
+
+    def to_delete(self, order: Sequence[int]) -> List[int]:
+        """Indices not kept, in the given order."""
+        if np is not None:
+            order = np.asarray(order)
+            return order[~self.keep[order]].tolist()
+        return [i for i in order if not self.keep[i]]
+
+    def deleted_total(self, values: Sequence[int]) -> int:
+        """Sum of values (e.g. sizes) over the indices not kept."""
+        if np is not None:
+            return int(_as_int64(values)[~self.keep].sum())
+        return sum(v for v, k in zip(values, self.keep) if not k)
+
+    def label(self, i: int) -> Tuple[str, str]:
+        return slot_label(int(self.codes[i]))
+
+    def labels(self, indices: Sequence[int]) -> List[Tuple[str, str]]:
+        """(tier, bucket_id) per index, formatted once per distinct slot."""
+        if np is not None:
+            codes = self.codes[np.asarray(indices, dtype=np.int64)].tolist()
+        else:
+            codes = [self.codes[i] for i in indices]
+        names = {c: slot_label(c) for c in set(codes)}
+        return [names[c] for c in codes]
@@ -1,12 +1,23 @@
+import bisect
+import math
 import os
+import queue
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import re
-from typing import Dict, List, Optional, Tuple
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from . import cache
+from .retention import RETENTION_POLICY, ObjectBatch, RetentionPlan, iso_seconds, slot_codes, slot_pieces, time_order, to_us
+from .timing import timed
+
 
 def get_allowed_buckets() -> List[str]:
     buckets_env = os.getenv("S3_BUCKETS", "").strip()
@@ -123,24 +134,108 @@ def get_s3_clients() -> List:
     return clients
 
 
-def _client_for_bucket(bucket: str):
-    """Return the first client that can access the given bucket via HeadBucket."""
+def _resolve_route(bucket: str, clients: List) -> Tuple[int, object]:
+    """HeadBucket each client in turn; caches and returns the first that answers."""
     last_exc = None
-    for c in get_s3_clients():
-        try:
-            c.head_bucket(Bucket=bucket)
-            return c
-        except ClientError as e:
-            last_exc = e
-            continue
-        except Exception as e:  # network or other errors
-            last_exc = e
-            continue
+    with timed("route"):
+        for i, c in enumerate(clients):
+            try:
+                c.head_bucket(Bucket=bucket)
+                cache.put(f"route:{bucket}", i, ttl=cache.route_ttl())
+                return i, c
+            except ClientError as e:
+                last_exc = e
+                continue
+            except Exception as e:  # network or other errors
+                last_exc = e
+                continue
     if last_exc:
         raise last_exc
     raise RuntimeError("No S3 clients configured")
 
 
+class _RoutedClient:
+    """A client taken from the cached route, re-routed when a call through it fails.
+
+    The endpoint may have stopped serving the bucket since the route was cached
+    (rotated credentials, outage, bucket moved). On an error the route is
+    dropped and HeadBucket runs again; when another client answers, the call is
+    retried once on it, otherwise the original error is raised.
+    """
+
+    def __init__(self, bucket: str, clients: List, idx: int) -> None:
+        self._bucket = bucket
+        self._clients = clients
+        self._idx = idx
+
+    def _reroute(self, exc: Exception):
+        cache.delete(f"route:{self._bucket}")
+        try:
+            idx, client = _resolve_route(self._bucket, self._clients)
+        except Exception:
+            raise exc
+        if idx == self._idx:
+            raise exc  # same endpoint: the error is not a routing problem
+        self._idx = idx
+        return client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._clients[self._idx], name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self._clients[self._idx], name)(*args, **kwargs)
+            except Exception as e:
+                return getattr(self._reroute(e), name)(*args, **kwargs)
+
+        return call
+
+    def get_paginator(self, name: str) -> "_RoutedPaginator":
+        return _RoutedPaginator(self, name)
+
+
+class _RoutedPaginator:
+    """Paginator of a _RoutedClient: a failure on the first page re-routes and
+    starts over; later failures drop the route and are raised."""
+
+    def __init__(self, routed: _RoutedClient, name: str) -> None:
+        self._routed = routed
+        self._name = name
+
+    def paginate(self, **kwargs) -> Iterator[Dict]:
+        routed = self._routed
+        pages = iter(routed._clients[routed._idx].get_paginator(self._name).paginate(**kwargs))
+        try:
+            first = next(pages, None)
+        except Exception as e:
+            pages = iter(routed._reroute(e).get_paginator(self._name).paginate(**kwargs))
+            first = next(pages, None)
+        if first is None:
+            return
+        yield first
+        try:
+            yield from pages
+        except Exception:
+            cache.delete(f"route:{routed._bucket}")
+            raise
+
+
+def _client_for_bucket(bucket: str):
+    """Return the first client that can access the given bucket via HeadBucket.
+
+    The index of the matching endpoint is cached so other requests (and workers)
+    skip the HeadBucket round-trips until the routing TTL expires; a call that
+    fails through a cached route re-runs the lookup (see _RoutedClient).
+    """
+    clients = get_s3_clients()
+    idx = cache.get(f"route:{bucket}")
+    if isinstance(idx, int) and 0 <= idx < len(clients):
+        return _RoutedClient(bucket, clients, idx)
+    return _resolve_route(bucket, clients)[1]
+
+
 def client_for_bucket(bucket: str):
     """Public wrapper to resolve an S3 client for a given bucket."""
     return _client_for_bucket(bucket)
@@ -152,6 +247,10 @@ def list_objects_page(
     continuation_token: Optional[str] = None,
     delimiter: str = "/",
 ) -> Dict:
+    cache_key = f"list:{bucket}:{delimiter}:{continuation_token or ''}:{prefix or ''}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
     s3 = _client_for_bucket(bucket)
     kwargs = {"Bucket": bucket, "Delimiter": delimiter, "MaxKeys": 500}
     if prefix:
@@ -159,7 +258,8 @@ def list_objects_page(
     if continuation_token:
         kwargs["ContinuationToken"] = continuation_token
 
-    resp = s3.list_objects_v2(**kwargs)
+    with timed("list"):
+        resp = s3.list_objects_v2(**kwargs)
     folders = [p.get("Prefix") for p in resp.get("CommonPrefixes", [])]
     objects: List[Dict] = []
     for o in resp.get("Contents", []):
@@ -171,24 +271,293 @@ def list_objects_page(
             continue
         if prefix and key == prefix:
             continue
-        objects.append(
-            {
-                "key": key,
-                "size": o.get("Size", 0),
-                "last_modified": (
-                    o.get("LastModified").replace(microsecond=0).isoformat() if o.get("LastModified") else None
-                ),
-                "storage_class": o.get("StorageClass"),
-            }
-        )
+        objects.append(_object_row(o))
 
-    return {
+    result = {
         "prefix": prefix or "",
         "folders": folders,
         "objects": objects,
         "is_truncated": resp.get("IsTruncated", False),
         "next_token": resp.get("NextContinuationToken"),
     }
+    cache.put(cache_key, result, bucket=bucket, prefix=prefix or "")
+    return result
+
+
+def _object_row(o: Dict) -> Dict:
+    """API listing entry for one S3 Contents item."""
+    lm = o.get("LastModified")
+    return {
+        "key": o.get("Key"),
+        "size": o.get("Size", 0),
+        "last_modified": lm.replace(microsecond=0).isoformat() if lm else None,
+        "storage_class": o.get("StorageClass"),
+    }
+
+
+# Parallel listers for iter_objects_recursive, and pages each may buffer ahead
+RECURSIVE_SHARDS = 8
+_SHARD_QUEUE_PAGES = 4
+# Delimiter listing pages read to plan the top-level shards (up to 20k children)
+_PLAN_PAGES = 20
+
+
+def _resume_after(start_after: Optional[str], prefix: str) -> Optional[str]:
+    """StartAfter for a listing of prefix: only when the cursor falls inside it."""
+    return start_after if start_after and start_after.startswith(prefix) else None
+
+
+def _expand_segment(
+    s3, bucket: str, prefix: str, start_after: Optional[str], max_pages: int = 1, row: Callable[[Dict], Dict] = _object_row
+) -> Optional[List[Tuple[str, Optional[Dict]]]]:
+    """Direct children of prefix in key order, or None when they do not fit max_pages pages.
+
+    Each segment is (name, row): an object row built by `row`, or None for a folder prefix.
+    A truncated page without folders also gives up: the prefix holds mostly
+    plain objects, which are listed faster as one shard than paged twice.
+    """
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "Delimiter": "/"}
+    if start_after:
+        kwargs["StartAfter"] = start_after
+    segs: List[Tuple[str, Optional[Dict]]] = []
+    for _ in range(max_pages):
+        with timed("list"):
+            resp = s3.list_objects_v2(**kwargs)
+        folders = [cp["Prefix"] for cp in resp.get("CommonPrefixes", []) if cp.get("Prefix")]
+        segs.extend((name, None) for name in folders)
+        for o in resp.get("Contents", []):
+            key = o.get("Key")
+            if not key or key.endswith("/") or key == prefix:
+                continue
+            segs.append((key, row(o)))
+        token = resp.get("NextContinuationToken")
+        if not resp.get("IsTruncated"):
+            # All keys under a folder sort together, right where its prefix sorts
+            segs.sort(key=lambda seg: seg[0])
+            return segs
+        if not folders or not token:
+            return None
+        kwargs["ContinuationToken"] = token
+    return None
+
+
+def _plan_segments(
+    s3, bucket: str, prefix: str, start_after: Optional[str], shards: int, row: Callable[[Dict], Dict] = _object_row
+) -> List[Tuple[str, Optional[Dict]]]:
+    """Split prefix into folder shards, descending up to two extra levels while there are fewer than `shards`.
+
+    The top level is paged through up to _PLAN_PAGES delimiter listings, so
+    prefixes with thousands of folders still get one shard per folder.
+    """
+    segs = _expand_segment(s3, bucket, prefix, _resume_after(start_after, prefix), _PLAN_PAGES, row)
+    if segs is None:
+        return [(prefix, None)]
+    for _ in range(2):
+        folders = [name for name, seg in segs if seg is None]
+        if not folders or len(folders) >= shards:
+            break
+        expanded: List[Tuple[str, Optional[Dict]]] = []
+        for name, seg in segs:
+            sub = None
+            if seg is None:
+                sub = _expand_segment(s3, bucket, name, _resume_after(start_after, name), row=row)
+            expanded.extend(sub if sub is not None else [(name, seg)])
+        segs = expanded
+    return segs
+
+
+def _put(q: queue.Queue, item, cancel: threading.Event) -> bool:
+    while not cancel.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _list_shard(
+    s3,
+    bucket: str,
+    prefix: str,
+    start_after: Optional[str],
+    out: queue.Queue,
+    cancel: threading.Event,
+    row: Callable[[Dict], Dict] = _object_row,
+) -> None:
+    """List prefix without a delimiter, pushing pages of rows, then None (or the exception)."""
+    try:
+        kwargs = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": 1000}
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        while True:
+            resp = s3.list_objects_v2(**kwargs)
+            rows = []
+            for o in resp.get("Contents", []):
+                key = o.get("Key")
+                if not key or key.endswith("/") or key == prefix:
+                    continue
+                rows.append(row(o))
+            if rows and not _put(out, rows, cancel):
+                return
+            token = resp.get("NextContinuationToken")
+            if not resp.get("IsTruncated") or not token:
+                break
+            kwargs["ContinuationToken"] = token
+        _put(out, None, cancel)
+    except Exception as e:  # surfaced to the consumer in key order
+        _put(out, e, cancel)
+
+
+def iter_objects_recursive(
+    bucket: str,
+    prefix: Optional[str] = None,
+    start_after: Optional[str] = None,
+    shards: int = RECURSIVE_SHARDS,
+    row: Callable[[Dict], Dict] = _object_row,
+) -> Iterator[Dict]:
+    """Yield every object under prefix (recursive, no delimiter) in key order.
+
+    Folders near the top of the prefix are listed as independent shards on a
+    thread pool, each buffering a few pages ahead, and merged back in key order.
+    start_after resumes right after a previously yielded key. `row` builds the
+    yielded item from an S3 Contents entry (API listing rows by default).
+    """
+    s3 = _client_for_bucket(bucket)
+    prefix = prefix or ""
+    segs = _plan_segments(s3, bucket, prefix, start_after, max(1, shards), row)
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, shards))
+    try:
+        # Submitted in key order, so the shard being consumed always has a worker
+        queues = []
+        for name, seg in segs:
+            if seg is None:
+                q: queue.Queue = queue.Queue(maxsize=_SHARD_QUEUE_PAGES)
+                pool.submit(_list_shard, s3, bucket, name, _resume_after(start_after, name), q, cancel, row)
+                queues.append(q)
+        pending = iter(queues)
+        for name, seg in segs:
+            if seg is not None:
+                yield seg
+                continue
+            q = next(pending)
+            while True:
+                item = q.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield from item
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def presign_get_url(s3, bucket: str, key: str, disposition: str = "attachment", expires: int = 300) -> str:
+    """Presign a GET for one key using an already resolved client."""
+    filename = key.split("/")[-1] or "download"
+    params = {
+        "Bucket": bucket,
+        "Key": key,
+        "ResponseContentDisposition": f"{disposition}; filename=\"{filename}\"",
+    }
+    return s3.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+
+def presign_keys(bucket: str, keys: List[str], disposition: str = "attachment", expires: int = 300) -> Dict:
+    """Presign GET URLs for many keys with a single bucket route lookup.
+
+    Signing is local to the client, so the only network call is the HeadBucket
+    done by the route lookup.
+    """
+    if not keys:
+        return {"expires_in": expires, "urls": []}
+    s3 = _client_for_bucket(bucket)
+    urls = [{"key": k, "url": presign_get_url(s3, bucket, k, disposition, expires)} for k in keys]
+    return {"expires_in": expires, "urls": urls}
+
+
+# Size of the reads from S3 object bodies when streaming a ZIP archive
+ZIP_CHUNK_SIZE = 1024 * 1024
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+class _ZipSink:
+    """Write-only, non-seekable target for ZipFile.
+
+    zipfile falls back to streaming mode (data descriptors) when the target
+    cannot tell/seek; written bytes are buffered here only until drained.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _zip_entry_name(name: str) -> str:
+    """Entry name without absolute or parent-directory parts.
+
+    S3 keys may contain "//", "." or ".." segments (or backslashes, which
+    some extractors treat as separators); kept as is they would make
+    entries that extract outside the target folder.
+    """
+    parts = name.replace("\\", "/").split("/")
+    return "/".join(p for p in parts if p not in ("", ".", ".."))
+
+
+def iter_prefix_zip(bucket: str, prefix: Optional[str] = None, chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive (store mode) of all objects under a prefix.
+
+    Object bodies are piped through in chunk_size reads, so memory stays bounded
+    by roughly one chunk regardless of archive size and nothing touches disk.
+    Entry names are relative to the prefix, with traversal segments removed.
+    """
+    s3 = _client_for_bucket(bucket)
+    paginator = s3.get_paginator("list_objects_v2")
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for page in paginator.paginate(Bucket=bucket, Prefix=(prefix or "")):
+            for o in page.get("Contents", []):
+                key = o.get("Key")
+                if not key or key.endswith("/"):
+                    continue
+                name = _zip_entry_name(key[len(prefix):] if prefix and key.startswith(prefix) else key)
+                if not name:
+                    continue
+                lm = o.get("LastModified")
+                # The ZIP format cannot store dates before 1980
+                date_time = max(lm.timetuple()[:6], _ZIP_EPOCH) if lm else _ZIP_EPOCH
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = zipfile.ZIP_STORED
+                # Declaring the size up front lets zipfile switch to ZIP64 for large objects
+                info.file_size = o.get("Size", 0)
+                body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+                try:
+                    with zf.open(info, mode="w") as dest:
+                        for chunk in body.iter_chunks(chunk_size):
+                            dest.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                finally:
+                    body.close()
+                data = sink.drain()
+                if data:
+                    yield data
+    # Central directory is written when the archive is closed
+    yield sink.drain()
 
 
 def delete_all_objects(bucket: str) -> Dict:
@@ -213,6 +582,8 @@ def delete_all_objects(bucket: str) -> Dict:
         return {"deleted": deleted, "batches": batches}
     except ClientError as e:
         return {"error": str(e), "deleted": deleted, "batches": batches}
+    finally:
+        cache.invalidate(bucket, [""])
 
 
 # Note: legacy "cleanup older than 30 days" helpers were removed intentionally.
@@ -222,6 +593,10 @@ def count_prefix(bucket: str, prefix: Optional[str] = None) -> Dict:
     """Count direct children in a prefix (non-recursive): files and folders.
     Uses Delimiter '/' to stay at current level and paginates across results.
     """
+    cache_key = f"count:{bucket}:{prefix or ''}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
     s3 = _client_for_bucket(bucket)
     paginator = s3.get_paginator("list_objects_v2")
     kwargs = {"Bucket": bucket, "Delimiter": "/"}
@@ -229,18 +604,21 @@ def count_prefix(bucket: str, prefix: Optional[str] = None) -> Dict:
         kwargs["Prefix"] = prefix
     files = 0
     folders = 0
-    for page in paginator.paginate(**kwargs):
-        folders += len(page.get("CommonPrefixes", []))
-        for o in page.get("Contents", []):
-            key = o.get("Key")
-            if not key:
-                continue
-            if key.endswith("/"):
-                continue
-            if prefix and key == prefix:
-                continue
-            files += 1
-    return {"prefix": prefix or "", "files": files, "folders": folders}
+    with timed("list"):
+        for page in paginator.paginate(**kwargs):
+            folders += len(page.get("CommonPrefixes", []))
+            for o in page.get("Contents", []):
+                key = o.get("Key")
+                if not key:
+                    continue
+                if key.endswith("/"):
+                    continue
+                if prefix and key == prefix:
+                    continue
+                files += 1
+    result = {"prefix": prefix or "", "files": files, "folders": folders}
+    cache.put(cache_key, result, bucket=bucket, prefix=prefix or "")
+    return result
 
 
 def smart_cleanup(bucket: str, prefix: Optional[str] = None, dry_run: bool = False) -> Dict:
@@ -251,113 +629,760 @@ def smart_cleanup(bucket: str, prefix: Optional[str] = None, dry_run: bool = Fal
     - 30–365 days: keep 1 per 7 days (weekly via ISO week)
     - >= 365 days: keep 1 per month
 
-    Returns summary of scanned/kept/deleted.
+    Returns summary of scanned/kept/deleted. Dry-run plans are cached briefly
+    so a preview followed by the approval dialog does not list the prefix twice.
     """
+    cache_key = f"plan:{bucket}:{prefix or ''}"
+    if dry_run:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
     s3 = _client_for_bucket(bucket)
     paginator = s3.get_paginator("list_objects_v2")
     now = datetime.now(timezone.utc)
     scanned = 0
 
-    # Gather all objects in prefix (non-delimited, recursive)
-    objects = []
-    for page in paginator.paginate(Bucket=bucket, Prefix=(prefix or "")):
-        contents = page.get("Contents", [])
-        for o in contents:
-            key = o.get("Key")
-            if not key or key.endswith("/"):
-                continue
-            lm = o.get("LastModified")
-            if not lm:
-                continue
-            size = o.get("Size", 0)
-            objects.append({"key": key, "last_modified": lm, "size": size})
-        scanned += len(contents)
-
-    # Sort by last modified to help select latest per bucket
-    objects.sort(key=lambda x: x["last_modified"])  # ascending
-
-    def tier_and_bucket(dt: datetime) -> Tuple[str, str]:
-        age = now - dt
-        days = age.total_seconds() / 86400
-        if days < 7:
-            # hourly
-            bucket_id = dt.replace(minute=0, second=0, microsecond=0).strftime("%Y-%m-%dT%H:00Z")
-            return ("hourly", bucket_id)
-        elif days < 30:
-            # daily
-            bucket_id = dt.date().strftime("%Y-%m-%d")
-            return ("daily", bucket_id)
-        elif days < 90:
-            # weekly (ISO week) for 1–3 months
-            iso_year, iso_week, _ = dt.isocalendar()
-            bucket_id = f"{iso_year}-W{iso_week:02d}"
-            return ("weekly", bucket_id)
-        elif days < 365:
-            # biweekly (every 2 ISO weeks) for >3 months and <1 year
-            iso_year, iso_week, _ = dt.isocalendar()
-            biweek = (iso_week - 1) // 2 + 1  # 1..26 or 27
-            bucket_id = f"{iso_year}-BW{biweek:02d}"
-            return ("biweekly", bucket_id)
-        else:
-            # monthly for >= 1 year
-            bucket_id = dt.strftime("%Y-%m")
-            return ("monthly", bucket_id)
+    # Gather all objects in prefix (non-delimited, recursive) as compact arrays
+    objects = ObjectBatch()
+    with timed("list"):
+        for page in paginator.paginate(Bucket=bucket, Prefix=(prefix or "")):
+            contents = page.get("Contents", [])
+            for o in contents:
+                key = o.get("Key")
+                if not key or key.endswith("/"):
+                    continue
+                lm = o.get("LastModified")
+                if not lm:
+                    continue
+                objects.append(key, lm, o.get("Size", 0))
+            scanned += len(contents)
+
+    # Ascending by last modified (stable), the order candidates are reported in
+    with timed("sort"):
+        order = time_order(objects.ts)
 
     # Pick the newest object per (tier,bucket_id)
-    keep_by_bucket: Dict[str, Dict] = {}
-    for obj in objects:
-        tier, bid = tier_and_bucket(obj["last_modified"])
-        k = f"{tier}:{bid}"
-        prev = keep_by_bucket.get(k)
-        if prev is None or obj["last_modified"] > prev["last_modified"]:
-            keep_by_bucket[k] = obj
-
-    keep_keys = {v["key"] for v in keep_by_bucket.values()}
-    to_delete = [o for o in objects if o["key"] not in keep_keys]
+    with timed("tiers"):
+        plan = RetentionPlan(objects.ts, now)
+        to_delete = plan.to_delete(order)
 
     deleted = 0
     batches = 0
     if not dry_run and to_delete:
-        for i in range(0, len(to_delete), 1000):
-            chunk = to_delete[i : i + 1000]
-            resp = s3.delete_objects(
-                Bucket=bucket,
-                Delete={"Objects": [{"Key": o["key"]} for o in chunk], "Quiet": True},
-            )
-            deleted += len(resp.get("Deleted", []))
-            batches += 1
+        with timed("delete"):
+            for i in range(0, len(to_delete), 1000):
+                chunk = to_delete[i : i + 1000]
+                resp = s3.delete_objects(
+                    Bucket=bucket,
+                    Delete={"Objects": [{"Key": k} for k in objects.keys(chunk)], "Quiet": True},
+                )
+                deleted += len(resp.get("Deleted", []))
+                batches += 1
+        cache.invalidate(bucket, [prefix or ""])
 
     result = {
         "prefix": prefix or "",
         "scanned": len(objects),
-        "kept": len(keep_keys),
+        "kept": plan.kept,
         "to_delete": len(to_delete),
         "deleted": deleted,
         "batches": batches,
-        "policy": {
-            "hourly": "< 7 days",
-            "daily": "7–30 days",
-            "weekly": "30–90 days",
-            "biweekly": "90–365 days",
-            "monthly": ">= 365 days",
-        },
+        "policy": dict(RETENTION_POLICY),
         # full candidate list for preview/approval
         "candidates": [],
     }
     # Attach policy details per candidate
-    for o in to_delete:
-        tier, bid = tier_and_bucket(o["last_modified"])
-        result["candidates"].append({
-            "key": o["key"],
-            "size": o["size"],
-            "last_modified": o["last_modified"].replace(microsecond=0).isoformat(),
-            "policy_tier": tier,
-            "policy_bucket_id": bid,
-            "policy_reason": f"Not newest for {tier} bucket {bid}",
-        })
+    with timed("tiers"):
+        rows = zip(to_delete, objects.keys(to_delete), iso_seconds(objects.ts, to_delete), plan.labels(to_delete))
+        for i, key, last_modified, (tier, bid) in rows:
+            result["candidates"].append({
+                "key": key,
+                "size": objects.sizes[i],
+                "last_modified": last_modified,
+                "policy_tier": tier,
+                "policy_bucket_id": bid,
+                "policy_reason": f"Not newest for {tier} bucket {bid}",
+            })
+    if dry_run:
+        cache.put(cache_key, result, bucket=bucket, prefix=prefix or "")
     return result
 
 
+# Appended to a key stem, sorts after every key that starts with that stem
+_MAX_KEY_SUFFIX = "\U0010ffff" * 4
+# Prefixes with up to this many subfolders are sampled folder by folder; beyond
+# that, an evenly spaced sample of the folders
+_MAX_SEGMENTS = 32
+# Prefixes that fit in this many listing pages are read in full: that costs
+# about as many requests as sampling them
+_EXACT_PAGES = 8
+# Series boundaries a sampled page may cross before its keys count as unordered
+_MAX_PAGE_RUNS = 3
+# Relative error allowed for each extrapolated gap on top of sampling error (key
+# density or object rate is rarely uniform)
+_GAP_MARGIN = 0.1
+
+
+class _KeySpace:
+    """Maps keys below a stem to integers so StartAfter probes can bisect key ranges.
+
+    Each character index has its own digit alphabet, learned from sampled keys:
+    the characters seen there, widened to all digits when any was seen and to
+    the letters of the same case between the lowest and highest seen there.
+    Fixed separators then cost nothing and timestamp or hex columns stay
+    close to uniform. End of key and unseen characters round down to the
+    nearest rank.
+    """
+
+    DIGITS = 24
+
+    def __init__(self, keys: List[str]):
+        self.alphabets: List[List[str]] = []
+        self.fallback: List[str] = []
+        self.learn(keys)
+
+    def learn(self, keys: List[str]) -> None:
+        """Widen the alphabets with characters from newly sampled keys."""
+        seen = set("".join(keys)) | set(self.fallback)
+        lower = {c for c in seen if c.islower()}
+        upper = {c for c in seen if c.isupper()}
+        self.fallback = sorted(seen | set("0123456789"))
+        width = max([len(k) for k in keys] + [len(self.alphabets)])
+        alphabets = []
+        for j in range(width):
+            chars = {k[j] for k in keys if len(k) > j}
+            if j < len(self.alphabets):
+                chars |= set(self.alphabets[j])
+            if any(c.isdigit() for c in chars):
+                chars |= set("0123456789")
+            for case in (lower, upper):
+                seen_here = chars & case
+                if seen_here:
+                    chars |= {c for c in case if min(seen_here) <= c <= max(seen_here)}
+            alphabets.append(sorted(chars) or self.fallback)
+        self.alphabets = alphabets
+
+    def _alphabet(self, j: int) -> List[str]:
+        return self.alphabets[j] if j < len(self.alphabets) else self.fallback
+
+    def size(self, stem: str) -> int:
+        n = 1
+        for j in range(len(stem), len(stem) + self.DIGITS):
+            n *= len(self._alphabet(j))
+        return n
+
+    def position(self, key: str, stem: str) -> int:
+        if not key.startswith(stem):
+            return 0 if key < stem else self.size(stem) - 1
+        pos = 0
+        for j in range(len(stem), len(stem) + self.DIGITS):
+            alphabet = self._alphabet(j)
+            digit = max(bisect.bisect_right(alphabet, key[j]) - 1, 0) if j < len(key) else 0
+            pos = pos * len(alphabet) + digit
+        return pos
+
+    def key(self, pos: int, stem: str) -> str:
+        """Inverse of position: a key sorting (about) at the start of pos."""
+        chars = []
+        for j in reversed(range(len(stem), len(stem) + self.DIGITS)):
+            alphabet = self._alphabet(j)
+            chars.append(alphabet[pos % len(alphabet)])
+            pos //= len(alphabet)
+        return stem + "".join(reversed(chars))
+
+
+def _probe_rows(resp: Dict) -> List[Dict]:
+    out = []
+    for o in resp.get("Contents", []):
+        key = o.get("Key")
+        if not key or key.endswith("/") or not o.get("LastModified"):
+            continue
+        out.append({"key": key, "last_modified": o["LastModified"], "size": o.get("Size", 0)})
+    return out
+
+
+def _probe_objects(
+    s3, bucket: str, prefix: str, start_after: Optional[str], max_keys: int
+) -> Tuple[List[Dict], bool]:
+    """One listing page after start_after; returns (objects, is_truncated)."""
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": max_keys}
+    if start_after:
+        kwargs["StartAfter"] = start_after
+    resp = s3.list_objects_v2(**kwargs)
+    return _probe_rows(resp), bool(resp.get("IsTruncated"))
+
+
+def _head_objects(s3, bucket: str, prefix: str, max_pages: int) -> Tuple[List[Dict], bool, int]:
+    """The first max_pages listing pages of prefix; returns (objects, is_truncated, requests)."""
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": 1000}
+    out: List[Dict] = []
+    for requests in range(1, max_pages + 1):
+        resp = s3.list_objects_v2(**kwargs)
+        out.extend(_probe_rows(resp))
+        token = resp.get("NextContinuationToken")
+        if not resp.get("IsTruncated") or not token:
+            return out, False, requests
+        kwargs["ContinuationToken"] = token
+    return out, True, max_pages
+
+
+def _bounds(value: float, low: float, high: Optional[float]) -> Dict:
+    """Point estimate with its range; high is None when the range is open-ended."""
+    return {
+        "estimate": round(value),
+        "low": max(0, round(min(low, value))),
+        "high": None if high is None else round(max(high, value)),
+    }
+
+
+def _page_stats(page: List[Dict]) -> Dict:
+    """Figures for one contiguous run of keys."""
+    ts = [to_us(o["last_modified"]) for o in page]
+    sizes = [o["size"] for o in page]
+    steps = [b >= a for a, b in zip(ts, ts[1:])]
+    return {
+        "first": page[0],
+        "last": page[-1],
+        "n": len(page),
+        "ts": ts,
+        "sizes": sizes,
+        "bytes": sum(sizes),
+        "secs": (ts[-1] - ts[0]) / 10**6,
+        # Key order follows time (timestamped names) rather than e.g. hashes
+        "ordered": not steps or sum(steps) >= 0.9 * len(steps),
+        # Keys of different lengths (unpadded counters) break key-space interpolation
+        "ragged": len({len(o["key"]) for o in page}) > 1,
+    }
+
+
+def _page_runs(page: List[Dict]) -> List[Dict]:
+    """_page_stats of a page, split where time runs backwards in time-ordered
+    pages: those are series boundaries (e.g. db0-… followed by db1-…), so
+    every run gets its own object rate."""
+    stats = _page_stats(page)
+    if not stats["ordered"]:
+        return [stats]
+    ts = stats["ts"]
+    cuts = [i for i in range(1, len(ts)) if ts[i] < ts[i - 1]]
+    if not cuts:
+        return [stats]
+    if len(cuts) > _MAX_PAGE_RUNS:
+        # Regular back-steps (dump-1000, dump-10000..10009, dump-1001, ...) are not
+        # series boundaries: key order does not follow time here
+        stats["ordered"] = False
+        return [stats]
+    return [_page_stats(page[a:b]) for a, b in zip([0] + cuts, cuts + [len(page)])]
+
+
+def _gap_estimate(ks: _KeySpace, a: Dict, b: Dict, gap: Dict) -> Tuple[float, float, float]:
+    """Estimated object count strictly between pages a and b, the standard error
+    of its rate and the variance of the gap's own count.
+
+    Time-ordered keys use the pooled object rate of both pages over
+    LastModified time; other keys the pooled density in key position space.
+    Both rates count the steps between neighbouring objects, one more than
+    the objects in the gap. Every page feeds the rate of the gaps on both of
+    its sides, so rate errors are not independent between gaps.
+    """
+    n = a["n"] + b["n"] - 2
+    if gap["empty"] or _is_branch_gap(a, b, gap):
+        return 0.0, 0.0, 0.0  # unresolved branch boundaries leave the range open
+    steps = None
+    if n <= 0:
+        pass
+    elif a["ordered"] and b["ordered"] and a["secs"] + b["secs"] > 0:
+        secs = (b["first"]["last_modified"] - a["last"]["last_modified"]).total_seconds()
+        steps = n / (a["secs"] + b["secs"]) * secs
+    else:
+        stem = os.path.commonprefix([a["first"]["key"], b["last"]["key"]])
+        a_lo, a_hi = ks.position(a["first"]["key"], stem), ks.position(a["last"]["key"], stem)
+        b_lo, b_hi = ks.position(b["first"]["key"], stem), ks.position(b["last"]["key"], stem)
+        width = (a_hi - a_lo) + (b_hi - b_lo)
+        if width > 0:
+            steps = n / width * max(0, ks.position(gap["hi"], stem) - a_hi)
+    count = max(0.0, steps - 1) if steps is not None else 0.0
+    rate_error = count / n ** 0.5 if n > 0 else 0.0
+    # Poisson noise of the gap itself. Until a gap is listed it may hold objects
+    # the rate misses (keys that sort below a probe key, uneven density), so its
+    # variance never drops below one object
+    return count, rate_error, max(1.0, count)
+
+
+def _gap_span(a: Dict, b: Dict) -> Tuple[int, int]:
+    """Time range [t0, t1) in epoch microseconds of the objects between pages a and b.
+
+    Between time-ordered pages that is the time between them; otherwise the
+    objects are assumed to spread like those of both pages.
+    """
+    if a["ordered"] and b["ordered"] and a["ts"][-1] <= b["ts"][0]:
+        return a["ts"][-1], b["ts"][0] + 1
+    return min(a["ts"] + b["ts"]), max(a["ts"] + b["ts"]) + 1
+
+
+def _same_series(a: Dict, b: Dict) -> bool:
+    """Whether the keys between ordered pages a and b can all continue a's series.
+
+    Names in one series differ only inside their timestamp, so from where
+    a.last and b.first diverge to where the keys of a page start to differ
+    there are digits and separators. A letter in there (db1-dump-... vs
+    db2-dump-...) means another series starts in the gap.
+    """
+    last = a["last"]["key"]
+    j = len(os.path.commonprefix([last, b["first"]["key"]]))
+    varying = [
+        len(os.path.commonprefix([p["first"]["key"], p["last"]["key"]])) for p in (a, b) if p["n"] > 1
+    ]
+    if not varying:
+        return True
+    return not any(c.isalpha() and c != "T" for c in last[j:max(j + 1, min(varying))])
+
+
+def _is_branch_gap(a: Dict, b: Dict, gap: Dict) -> bool:
+    """A new series starts in the gap between ordered pages: time runs backwards
+    across it, or the key names on both sides differ outside their timestamps."""
+    return (
+        not gap["empty"]
+        and a["ordered"]
+        and b["ordered"]
+        and (b["first"]["last_modified"] < a["last"]["last_modified"] or not _same_series(a, b))
+    )
+
+
+def _is_ragged_gap(a: Dict, b: Dict, gap: Dict) -> bool:
+    """The gap is estimated from key density over keys of varying length, where
+    longer keys (dump-10000 after dump-1000) hide in ranges that look empty."""
+    return not gap["empty"] and not (a["ordered"] and b["ordered"]) and (a["ragged"] or b["ragged"])
+
+
+def _find_tail(
+    s3, bucket: str, ks: _KeySpace, stem: str, after: List[Dict], page_size: int, max_probes: int = 32
+) -> Tuple[List[Dict], bool, int]:
+    """Last page of keys below stem that sort after the page `after`.
+
+    Gallops upward in position space, starting from the width of `after` and
+    doubling, then bisects once a probe comes back empty. Bounds are kept as
+    keys so the key space can learn from every page found.
+    Returns (page, reached_end, requests); page is empty when no key follows.
+    """
+    tail: List[Dict] = []
+    last_key = after[-1]["key"]
+    step = max(1, ks.position(last_key, stem) - ks.position(after[0]["key"], stem))
+    upper_key: Optional[str] = None  # no key sorts after it
+    requests = 0
+    for _ in range(max_probes):
+        if upper_key is None:
+            lo = ks.position(last_key, stem)
+            start = ks.key(min(lo + step, ks.size(stem) - 1), stem)
+        else:
+            pos_stem = os.path.commonprefix([last_key, upper_key])
+            lo, hi = ks.position(last_key, pos_stem), ks.position(upper_key, pos_stem)
+            # Out of position resolution: continue with the next page instead
+            start = ks.key((lo + hi) // 2, pos_stem) if hi - lo > 1 else last_key
+        start = max(start, last_key)
+        requests += 1
+        found, more = _probe_objects(s3, bucket, stem, start, page_size)
+        if not found:
+            if start == last_key:
+                return tail, True, requests
+            upper_key = start
+            continue
+        ks.learn([o["key"] for o in found])
+        tail = found
+        last_key = found[-1]["key"]
+        step *= 2
+        if not more:
+            return tail, True, requests
+    return tail, False, requests
+
+
+def _segments(s3, bucket: str, prefix: str) -> Tuple[List[Dict], List[str], int]:
+    """Subfolders of prefix to sample separately, and the objects directly in it.
+
+    Series in sibling folders (db1/, db2/, ...) overlap in time, so each is
+    sampled on its own. Descends while the prefix holds a single folder. Returns
+    ([], [prefix], requests) when there are no subfolders, or more than one
+    listing page of them.
+    """
+    requests = 0
+    for _ in range(4):
+        resp = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter="/", MaxKeys=1000)
+        requests += 1
+        folders = [cp["Prefix"] for cp in resp.get("CommonPrefixes", [])]
+        direct = _probe_rows(resp)
+        if resp.get("IsTruncated") or not folders:
+            break
+        if len(folders) > 1 or direct:
+            return direct, folders, requests
+        prefix = folders[0]
+    return [], [prefix], requests
+
+
+def _sample_segment(
+    s3, bucket: str, stem: str, probes: int, page_size: int, first: Optional[List[Dict]] = None
+) -> Dict:
+    """Sampled pages of the keys below stem, in key order, and the gaps between them.
+
+    gaps[i] is the unlisted range between pages i and i+1, bounded above by the
+    key "hi" (shrinks as probes come back empty).
+    """
+    requests = 0
+    more = True
+    if first is None:
+        first, more = _probe_objects(s3, bucket, stem, None, 1000)
+        requests += 1
+    segment = {"pages": [], "gaps": [], "ks": None, "requests": requests}
+    if not first:
+        return segment
+    pages = segment["pages"]
+    gaps = segment["gaps"]
+    runs = _page_runs(first)
+    pages.extend(runs)
+    gaps.extend({"hi": r["first"]["key"], "empty": True} for r in runs[1:])
+    if not more:
+        return segment
+
+    ks = segment["ks"] = _KeySpace([o["key"] for o in first])
+    tail, _, used = _find_tail(s3, bucket, ks, stem, first, page_size)
+    requests += used
+    if tail:
+        runs = _page_runs(tail)
+        pages.extend(runs)
+        gaps.append({"hi": tail[0]["key"], "empty": False})
+        gaps.extend({"hi": r["first"]["key"], "empty": True} for r in runs[1:])
+
+    def insert_page(i: int, page: List[Dict], reaches_next: bool) -> None:
+        ks.learn([o["key"] for o in page])
+        runs = _page_runs(page)
+        pages[i + 1:i + 1] = runs
+        # Runs of one page are contiguous, so the gaps between them are empty
+        gaps[i:i + 1] = (
+            [{"hi": page[0]["key"], "empty": False}]
+            + [{"hi": r["first"]["key"], "empty": True} for r in runs[1:]]
+            + [{"hi": gaps[i]["hi"], "empty": reaches_next}]
+        )
+
+    # Locating where a series ends costs extra requests, so branches get their own
+    # budget; so does checking the gaps expected to hold less than one object
+    branch_steps = 4 * probes
+    checks = 2 * probes
+    while gaps:
+        branch = [_is_branch_gap(pages[j], pages[j + 1], gaps[j]) for j in range(len(gaps))]
+        check = False
+        if any(branch) and branch_steps > 0:
+            i = branch.index(True)
+            branch_steps -= 1
+        else:
+            estimates = [_gap_estimate(ks, pages[j], pages[j + 1], gaps[j])[0] for j in range(len(gaps))]
+            i = max(range(len(gaps)), key=lambda j: estimates[j])
+            if estimates[i] < 1 or probes <= 0:
+                # A near-zero estimate is not proof: list from the gap's lower end
+                small = [j for j in range(len(gaps)) if not gaps[j]["empty"] and not branch[j] and estimates[j] < 1]
+                if not small or checks <= 0:
+                    break
+                i = small[0]
+                check = True
+                checks -= 1
+            else:
+                probes -= 1
+        lo_key, upto = pages[i]["last"]["key"], pages[i + 1]["first"]["key"]
+        if branch[i]:
+            # Skip the rest of this branch: the next key belongs to a later series
+            branch_stem = lo_key[:len(os.path.commonprefix([lo_key, upto])) + 1]
+            requests += 1
+            found, _ = _probe_objects(s3, bucket, stem, branch_stem + _MAX_KEY_SUFFIX, page_size)
+            page = [o for o in found if o["key"] < upto]
+            if page:
+                insert_page(i, page, len(page) < len(found))
+                continue
+            # Every key in the gap continues this branch: find where it ends
+            after = [pages[i]["first"], pages[i]["last"]]
+            tail, reached_end, used = _find_tail(s3, bucket, ks, branch_stem, after, page_size)
+            requests += used
+            tail = [o for o in tail if o["key"] < upto]
+            if tail:
+                insert_page(i, tail, reached_end)
+            else:
+                gaps[i]["empty"] = True
+            continue
+        pos_stem = os.path.commonprefix([lo_key, gaps[i]["hi"]])
+        lo, hi = ks.position(lo_key, pos_stem), ks.position(gaps[i]["hi"], pos_stem)
+        start = lo_key if check else max(ks.key((lo + hi) // 2, pos_stem), lo_key)
+        requests += 1
+        found, more = _probe_objects(s3, bucket, stem, start, page_size)
+        page = [o for o in found if o["key"] < upto]
+        if page:
+            insert_page(i, page, len(page) < len(found) or not more)
+        elif start == lo_key:
+            gaps[i]["empty"] = True
+        else:
+            gaps[i]["hi"] = start  # nothing between start and the next page
+    segment["requests"] = requests
+    return segment
+
+
+def _segment_totals(seg: Dict, now_us: int, newest: Dict[int, Tuple[int, int]], cuts: List[int]) -> Dict:
+    """Objects and bytes of a sampled segment with their variances, and its
+    objects per slot as [objects, bytes]: sampled and unlisted ("spread"), and
+    the unlisted ones newer than the newest sampled object of the slot ("newer").
+    """
+    totals = {
+        "objects": 0.0, "bytes": 0.0, "var": 0.0, "bytes_var": 0.0, "unresolved": 0, "ragged": 0, "spread": {}, "newer": {}
+    }
+    # Rate errors of neighbouring gaps share pages: summed as if fully correlated
+    rate_error = bytes_rate_error = 0.0
+
+    def add(name: str, code: int, count: float, size: float) -> None:
+        slot = totals[name].setdefault(code, [0.0, 0.0])
+        slot[0] += count
+        slot[1] += count * size
+
+    for p in seg["pages"]:
+        totals["objects"] += p["n"]
+        totals["bytes"] += p["bytes"]
+        for code, size in zip(slot_codes(p["ts"], now_us), p["sizes"]):
+            add("spread", int(code), 1, size)
+    for i, gap in enumerate(seg["gaps"]):
+        a, b = seg["pages"][i], seg["pages"][i + 1]
+        totals["unresolved"] += _is_branch_gap(a, b, gap)
+        totals["ragged"] += _is_ragged_gap(a, b, gap)
+        count, count_rate_error, count_var = _gap_estimate(seg["ks"], a, b, gap)
+        sample = a["sizes"] + b["sizes"]
+        size = sum(sample) / len(sample)
+        size_var = sum((x - size) ** 2 for x in sample) / len(sample)
+        count_var += (_GAP_MARGIN * count) ** 2
+        totals["var"] += count_var
+        # Object count error, plus the error of the mean object size
+        totals["bytes_var"] += count_var * size ** 2 + count ** 2 * (size_var / len(sample) + (_GAP_MARGIN * size) ** 2)
+        rate_error += count_rate_error
+        bytes_rate_error += count_rate_error * size
+        if count <= 0:
+            continue
+        totals["objects"] += count
+        totals["bytes"] += count * size
+        t0, t1 = _gap_span(a, b)
+        for code, x0, x1 in slot_pieces(t0, t1, now_us, cuts):
+            share = count * (x1 - x0) / (t1 - t0)
+            add("spread", code, share, size)
+            if code not in newest or x0 > newest[code][0]:
+                add("newer", code, share, size)
+    totals["var"] += rate_error ** 2
+    totals["bytes_var"] += bytes_rate_error ** 2
+    return totals
+
+
+def estimate_smart_cleanup(bucket: str, prefix: Optional[str] = None, probes: int = 16, page_size: int = 200) -> Dict:
+    """Estimate the impact of smart_cleanup without a full recursive scan.
+
+    Small prefixes (a single listing page) are computed exactly. Otherwise the
+    prefix is split into its subfolders, sampled in parallel, sharing `probes`.
+    In each, the end of the sorted key range is located with StartAfter probes,
+    and further probes read page_size keys inside the unlisted gap with the
+    largest estimated object count. Where time runs backwards across a gap (a
+    new series starts in it), the probe jumps to the next branch or locates the
+    tail of the current one instead.
+
+    Gaps are extrapolated from the object rate (or key density) of their
+    neighbouring pages. smart_cleanup keeps one object per occupied slot across
+    the whole prefix, so deletions are the estimated objects minus the occupied
+    slots: those seen in the sampled pages plus, for every other slot a gap
+    spans in time, the chance that one of the gap's objects falls into it.
+    Ranges are rough: sampling error plus a margin for uneven key density,
+    and hard limits from the sampled objects. Series that could not be
+    resolved leave the upper end open (None). The exact preview remains
+    authoritative.
+    """
+    s3 = _client_for_bucket(bucket)
+    now = datetime.now(timezone.utc)
+    prefix = prefix or ""
+
+    first, more, head_requests = _head_objects(s3, bucket, prefix, _EXACT_PAGES)
+    result = {"prefix": prefix, "policy": dict(RETENTION_POLICY)}
+    if not more:
+        plan = RetentionPlan(array("q", (to_us(o["last_modified"]) for o in first)), now)
+        to_delete = [o for i, o in enumerate(first) if not plan.keep[i]]
+        exact = {
+            "objects": len(first),
+            "bytes": sum(o["size"] for o in first),
+            "to_delete": len(to_delete),
+            "to_delete_bytes": sum(o["size"] for o in to_delete),
+        }
+        result.update({"mode": "exact", "sampled": len(first), "probes": head_requests, "requests": head_requests})
+        result.update({name: _bounds(v, v, v) for name, v in exact.items()})
+        return result
+
+    direct, folders, requests = _segments(s3, bucket, prefix)
+    requests += head_requests
+    # Beyond _MAX_SEGMENTS folders, an evenly spaced sample of them stands in for the rest
+    stems = folders
+    if len(folders) > _MAX_SEGMENTS:
+        stems = [folders[(2 * i + 1) * len(folders) // (2 * _MAX_SEGMENTS)] for i in range(_MAX_SEGMENTS)]
+    weight = len(folders) / len(stems)
+    share = max(1, -(-probes // len(stems)))
+    if len(folders) == 1 and not direct:
+        # Everything under prefix lies in this one folder: the head listing applies as is
+        segments = [_sample_segment(s3, bucket, folders[0], share, page_size, first)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(RECURSIVE_SHARDS, len(stems))) as pool:
+            segments = list(pool.map(lambda stem: _sample_segment(s3, bucket, stem, share, page_size), stems))
+    weights = [weight] * len(segments)
+    if direct:
+        segments.append({"pages": [_page_stats(direct)], "gaps": [], "ks": None, "requests": 0})
+        weights.append(1.0)
+    requests += sum(seg["requests"] for seg in segments)
+
+    # Slots seen in the sampled pages are occupied for certain. The object kept
+    # there is their newest sampled one, unless an unlisted one is newer still.
+    pages = [p for seg in segments for p in seg["pages"]]
+    ts = array("q", (t for p in pages for t in p["ts"]))
+    sizes = [s for p in pages for s in p["sizes"]]
+    plan = RetentionPlan(ts, now)
+    newest = {int(plan.codes[i]): (ts[i], sizes[i]) for i in range(len(ts)) if plan.keep[i]}
+    newest_cuts = sorted(t + 1 for t, _ in newest.values())
+    sampled = len(sizes)
+    sampled_bytes = sum(sizes)
+
+    now_us = to_us(now)
+    objects = total_bytes = var = bytes_var = 0.0
+    # Unlisted objects per slot that may be kept there, as [objects, bytes]
+    expected: Dict[int, List[float]] = {}
+    unresolved = ragged = 0
+    folder_totals = []
+    for seg, w in zip(segments, weights):
+        totals = _segment_totals(seg, now_us, newest, newest_cuts)
+        objects += w * totals["objects"]
+        total_bytes += w * totals["bytes"]
+        var += w * totals["var"]
+        bytes_var += w * totals["bytes_var"]
+        unresolved += totals["unresolved"]
+        ragged += totals["ragged"]
+        for code, (x, xb) in totals["newer"].items():
+            slot = expected.setdefault(code, [0.0, 0.0])
+            slot[0] += x
+            slot[1] += xb
+        if w > 1:
+            folder_totals.append((totals["objects"], totals["bytes"]))
+            # Unsampled folders fill the slots like this one; in a seen slot
+            # about half of their objects are newer than the newest sampled one
+            for code, (x, xb) in totals["spread"].items():
+                f = (w - 1) * (0.5 if code in newest else 1.0)
+                slot = expected.setdefault(code, [0.0, 0.0])
+                slot[0] += f * x
+                slot[1] += f * xb
+    if len(folder_totals) > 1:
+        # Between-folder error of the folder sample (with finite population correction)
+        m, f = len(folder_totals), len(folders)
+        for j in range(2):
+            values = [t[j] for t in folder_totals]
+            mean = sum(values) / m
+            spread = f * (f - m) * sum((v - mean) ** 2 for v in values) / (m - 1) / m
+            if j == 0:
+                var += spread
+            else:
+                bytes_var += spread
+
+    # Unlisted objects land in a slot like Poisson arrivals: at least one with 1 - e^-expected
+    kept = float(len(newest))
+    kept_bytes = kept_bytes_low = kept_bytes_high = 0.0
+    for code in newest.keys() | expected.keys():
+        x, xb = expected.get(code, (0.0, 0.0))
+        p = 1 - math.exp(-x)
+        gap_size = xb / x if x else 0.0
+        if code in newest:
+            size = newest[code][1]
+            kept_bytes += (1 - p) * size + p * gap_size
+            kept_bytes_low += min(size, gap_size) if x else size
+            kept_bytes_high += max(size, gap_size)
+        else:
+            kept += p
+            kept_bytes += p * gap_size
+            kept_bytes_high += gap_size
+    kept_high = len(newest) + len(expected.keys() - newest.keys())
+
+    half, bytes_half = 1.96 * var ** 0.5, 1.96 * bytes_var ** 0.5
+    objects_low, objects_high = max(sampled, objects - half), objects + half
+    bytes_low, bytes_high = max(sampled_bytes, total_bytes - bytes_half), total_bytes + bytes_half
+    # Sampled objects that are not the newest of their slot are deleted for certain
+    deleted_sampled_bytes = sampled_bytes - sum(size for _, size in newest.values())
+    if unresolved or ragged:
+        objects_high = bytes_high = None
+    if ragged:
+        # Nothing but the sampled objects is certain
+        objects_low, bytes_low = sampled, sampled_bytes
+
+    result.update({
+        "mode": "sampled",
+        "sampled": sampled,
+        "probes": len(pages),
+        "requests": requests,
+        "segments": len(stems),
+        "objects": _bounds(objects, objects_low, objects_high),
+        "bytes": _bounds(total_bytes, bytes_low, bytes_high),
+        "to_delete": _bounds(
+            objects - kept,
+            max(sampled - len(newest), objects_low - kept_high),
+            None if objects_high is None else objects_high - len(newest),
+        ),
+        "to_delete_bytes": _bounds(
+            total_bytes - kept_bytes,
+            max(deleted_sampled_bytes, bytes_low - kept_bytes_high),
+            None if bytes_high is None else bytes_high - kept_bytes_low,
+        ),
+    })
+    return result
+
+
+def bucket_overview(bucket: str, progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Whole-bucket stats for the landing page, from one parallel recursive listing.
+
+    Besides object count, bytes and oldest/newest object, the pass keeps only
+    the timestamp and size of every object (two int64 arrays), so the bytes
+    smart cleanup would reclaim at the bucket root are exact. progress, when
+    given, is called with the running object count every 1000 objects.
+    """
+    s3 = _client_for_bucket(bucket)
+    now = datetime.now(timezone.utc)
+    objects = 0
+    total = 0
+    oldest: Optional[Tuple[datetime, str]] = None
+    newest: Optional[Tuple[datetime, str]] = None
+    ts = array("q")
+    sizes = array("q")
+    # Raw S3 entries: no API row dict is built per object
+    for o in iter_objects_recursive(bucket, row=lambda o: o):
+        objects += 1
+        size = o.get("Size") or 0
+        total += size
+        if progress and objects % 1000 == 0:
+            progress(objects)
+        lm = o.get("LastModified")
+        if not lm:
+            continue
+        ts.append(to_us(lm))
+        sizes.append(size)
+        if oldest is None or lm < oldest[0]:
+            oldest = (lm, o["Key"])
+        if newest is None or lm >= newest[0]:
+            newest = (lm, o["Key"])
+    with timed("tiers"):
+        plan = RetentionPlan(ts, now)
+        reclaimable = plan.deleted_total(sizes)
+
+    def stamp(entry: Optional[Tuple[datetime, str]]) -> Optional[Dict]:
+        if entry is None:
+            return None
+        return {"key": entry[1], "last_modified": entry[0].replace(microsecond=0).isoformat()}
+
+    return {
+        "bucket": bucket,
+        "endpoint": getattr(getattr(s3, "meta", None), "endpoint_url", None),
+        "objects": objects,
+        "bytes": total,
+        "oldest": stamp(oldest),
+        "newest": stamp(newest),
+        "reclaimable_bytes": reclaimable,
+    }
+
+
 def delete_keys(bucket: str, keys: List[str]) -> Dict:
     """Delete provided keys in chunks of 1000."""
     if not keys:
@@ -374,6 +1399,7 @@ def delete_keys(bucket: str, keys: List[str]) -> Dict:
         errs = resp.get("Errors", [])
         for e in errs:
             errors.append({"key": e.get("Key"), "code": e.get("Code"), "message": e.get("Message")})
+    cache.invalidate(bucket, cache.parent_prefixes(keys))
     result = {"deleted": deleted, "batches": batches}
     if errors:
         result["errors"] = errors
@@ -396,6 +1422,7 @@ def delete_prefix(bucket: str, prefix: str) -> Dict:
             resp = s3.delete_objects(Bucket=bucket, Delete={"Objects": chunk, "Quiet": True})
             deleted += len(resp.get("Deleted", []))
             batches += 1
+    cache.invalidate(bucket, [prefix])
     return {"deleted": deleted, "batches": batches}
 
 
@@ -512,6 +1539,11 @@ def smart_cleanup_folders(bucket: str, parent_prefix: Optional[str] = None, dry_
     Only subfolders whose trailing segment parses to a timestamp are considered.
     Deletion removes all objects under the selected prefixes.
     """
+    cache_key = f"plan-folders:{bucket}:{parent_prefix or ''}"
+    if dry_run:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
     s3 = _client_for_bucket(bucket)
     paginator = s3.get_paginator("list_objects_v2")
     now = datetime.now(timezone.utc)
@@ -523,92 +1555,63 @@ def smart_cleanup_folders(bucket: str, parent_prefix: Optional[str] = None, dry_
     # Gather subfolders
     folders: List[Dict] = []
     scanned = 0
-    for page in paginator.paginate(**kwargs):
-        cps = page.get("CommonPrefixes", [])
-        scanned += len(cps)
-        for cp in cps:
-            pfx = cp.get("Prefix")
-            if not pfx:
-                continue
-            name = pfx
-            if parent_prefix and pfx.startswith(parent_prefix):
-                name = pfx[len(parent_prefix):]
-            name = name.rstrip("/")
-            ts = _parse_timestamp(name)
-            if not ts:
-                continue  # skip non-timestamped folders
-            folders.append({"prefix": pfx, "ts": ts})
+    with timed("list"):
+        for page in paginator.paginate(**kwargs):
+            cps = page.get("CommonPrefixes", [])
+            scanned += len(cps)
+            for cp in cps:
+                pfx = cp.get("Prefix")
+                if not pfx:
+                    continue
+                name = pfx
+                if parent_prefix and pfx.startswith(parent_prefix):
+                    name = pfx[len(parent_prefix):]
+                name = name.rstrip("/")
+                ts = _parse_timestamp(name)
+                if not ts:
+                    continue  # skip non-timestamped folders
+                folders.append({"prefix": pfx, "ts": ts})
 
     # Sort by ts for deterministic keep selection
-    folders.sort(key=lambda x: x["ts"])  # ascending
-
-    def tier_and_bucket(dt: datetime) -> Tuple[str, str]:
-        age = now - dt
-        days = age.total_seconds() / 86400
-        if days < 7:
-            bucket_id = dt.replace(minute=0, second=0, microsecond=0).strftime("%Y-%m-%dT%H:00Z")
-            return ("hourly", bucket_id)
-        elif days < 30:
-            bucket_id = dt.date().strftime("%Y-%m-%d")
-            return ("daily", bucket_id)
-        elif days < 90:
-            iso_year, iso_week, _ = dt.isocalendar()
-            bucket_id = f"{iso_year}-W{iso_week:02d}"
-            return ("weekly", bucket_id)
-        elif days < 365:
-            iso_year, iso_week, _ = dt.isocalendar()
-            biweek = (iso_week - 1) // 2 + 1
-            bucket_id = f"{iso_year}-BW{biweek:02d}"
-            return ("biweekly", bucket_id)
-        else:
-            bucket_id = dt.strftime("%Y-%m")
-            return ("monthly", bucket_id)
-
-    keep_by_bucket: Dict[str, Dict] = {}
-    for item in folders:
-        tier, bid = tier_and_bucket(item["ts"])
-        k = f"{tier}:{bid}"
-        prev = keep_by_bucket.get(k)
-        if prev is None or item["ts"] > prev["ts"]:
-            keep_by_bucket[k] = item
+    with timed("sort"):
+        folders.sort(key=lambda x: x["ts"])  # ascending
 
-    keep_prefixes = {v["prefix"] for v in keep_by_bucket.values()}
-    to_delete = [f for f in folders if f["prefix"] not in keep_prefixes]
+    with timed("tiers"):
+        plan = RetentionPlan(array("q", (to_us(f["ts"]) for f in folders)), now)
+        to_delete = [i for i in range(len(folders)) if not plan.keep[i]]
 
     deleted = 0
     batches = 0
     if not dry_run and to_delete:
-        for chunk_start in range(0, len(to_delete), 50):  # delete 50 folders per batch loop
-            chunk = to_delete[chunk_start:chunk_start+50]
-            res = delete_prefixes(bucket, [c["prefix"] for c in chunk])
-            deleted += res.get("deleted", 0)
-            batches += res.get("batches", 0)
+        with timed("delete"):
+            for chunk_start in range(0, len(to_delete), 50):  # delete 50 folders per batch loop
+                chunk = to_delete[chunk_start:chunk_start+50]
+                res = delete_prefixes(bucket, [folders[i]["prefix"] for i in chunk])
+                deleted += res.get("deleted", 0)
+                batches += res.get("batches", 0)
 
     result = {
         "prefix": parent_prefix or "",
         "scanned_folders": scanned,
         "considered_folders": len(folders),
-        "kept": len(keep_prefixes),
+        "kept": plan.kept,
         "to_delete": len(to_delete),
         "deleted": deleted,
         "batches": batches,
-        "policy": {
-            "hourly": "< 7 days",
-            "daily": "7–30 days",
-            "weekly": "30–90 days",
-            "biweekly": "90–365 days",
-            "monthly": ">= 365 days",
-        },
+        "policy": dict(RETENTION_POLICY),
         "candidates": [],
     }
-    for f in to_delete:
-        tier, bid = tier_and_bucket(f["ts"])
-        result["candidates"].append({
-            "key": f["prefix"],
-            "last_modified": f["ts"].isoformat(),
-            "size": None,
-            "policy_tier": tier,
-            "policy_bucket_id": bid,
-            "policy_reason": f"Not newest for {tier} bucket {bid}",
-        })
+    with timed("tiers"):
+        for i, (tier, bid) in zip(to_delete, plan.labels(to_delete)):
+            f = folders[i]
+            result["candidates"].append({
+                "key": f["prefix"],
+                "last_modified": f["ts"].isoformat(),
+                "size": None,
+                "policy_tier": tier,
+                "policy_bucket_id": bid,
+                "policy_reason": f"Not newest for {tier} bucket {bid}",
+            })
+    if dry_run:
+        cache.put(cache_key, result, bucket=bucket, prefix=parent_prefix or "")
     return result
@@ -1,6 +1,16 @@
 import os
+import cProfile
 import hashlib
-from flask import Flask, jsonify, request, redirect, render_template
+import hmac
+import json
+import time
+import unicodedata
+from itertools import chain
+from urllib.parse import quote
+from flask import Flask, Response, g, jsonify, request, redirect, render_template, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from . import timing
+from .overview import get_overview
 from .s3_utils import (
     get_allowed_buckets,
     list_objects_page,
@@ -10,11 +20,60 @@ from .s3_utils import (
     client_for_bucket,
     delete_prefixes,
     smart_cleanup_folders,
+    presign_get_url,
+    presign_keys,
+    iter_prefix_zip,
+    estimate_smart_cleanup,
+    iter_objects_recursive,
 )
 
+# Upper bound for keys signed in one /presign call
+MAX_PRESIGN_KEYS = 1000
+# Upper bound for objects streamed by one /list-recursive call (resume with the cursor)
+MAX_RECURSIVE_OBJECTS = 50000
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records encoding time as the 'serialize' phase."""
+
+    def dumps(self, obj, **kwargs):
+        with timing.timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _flag(name: str) -> bool:
+    return request.args.get(name) in ("1", "true", "True")
+
+
+def _set_attachment(resp: Response, filename: str) -> None:
+    """Content-Disposition the way Werkzeug's send_file builds it.
+
+    Names that are not plain ASCII get an RFC 5987 filename* plus an ASCII
+    fallback, so the header stays Latin-1 encodable for the WSGI server.
+    """
+    try:
+        filename.encode("ascii")
+        value = {"filename": filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        value = {"filename": simple, "filename*": f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    # Headers.set quotes and escapes the parameter values
+    resp.headers.set("Content-Disposition", "attachment", **value)
+
+
+def _profile_allowed() -> bool:
+    """?profile=1 needs PROFILE_TOKEN set and sent back via the X-Profile-Token header
+    (never the query string, which ends up in access logs and browser history)."""
+    token = os.getenv("PROFILE_TOKEN")
+    if not token:
+        return False
+    given = request.headers.get("X-Profile-Token", "")
+    return hmac.compare_digest(given.encode(), token.encode())
+
 
 def create_app():
     app = Flask(__name__, static_folder="static", static_url_path="/static")
+    app.json = TimedJSONProvider(app)
 
     # Compute simple content hashes for static assets to use as cache-busting query params
     def _asset_hash(filename: str) -> str:
@@ -33,6 +92,51 @@ def create_app():
 
     asset_ver = {fn: _asset_hash(fn) for fn in ("styles.css", "app.js", "logo.svg")}
 
+    # Per-request phase timings for API calls: always sent as a Server-Timing
+    # header, added to JSON bodies as "timings" with ?timings=1.
+    @app.before_request
+    def _start_timing():
+        if not request.path.startswith("/api/"):
+            return None
+        if _flag("profile"):
+            if not _profile_allowed():
+                return jsonify({"error": "Profiling not allowed"}), 403
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+                g.profiler = prof
+            except ValueError:  # another profiler is already active in this process
+                pass
+        timing.start()
+        g.timing_start = time.perf_counter()
+        return None
+
+    @app.after_request
+    def _finish_timing(response):
+        phases = timing.stop()
+        if phases is None:
+            return response
+        phases["total"] = (time.perf_counter() - g.pop("timing_start")) * 1000.0
+        response.headers["Server-Timing"] = timing.server_timing_header(phases)
+
+        info = {name: round(ms, 1) for name, ms in phases.items()}
+        prof = g.pop("profiler", None)
+        if prof is not None:
+            prof.disable()
+            out_dir = os.getenv("PROFILE_DIR", "/tmp/web-s3-cleaner-profiles")
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"{int(time.time())}-{request.endpoint}-{os.getpid()}.prof")
+            prof.dump_stats(path)
+            response.headers["X-Profile-File"] = path
+            info["profile"] = path
+
+        if _flag("timings") and response.is_json and not response.is_streamed:
+            data = response.get_json(silent=True)
+            if isinstance(data, dict):
+                data["timings"] = info
+                response.set_data(app.json.dumps(data))
+        return response
+
     @app.get("/api/healthz")
     def healthz():
         return jsonify({"status": "ok"})
@@ -42,6 +146,14 @@ def create_app():
         buckets = get_allowed_buckets()
         return jsonify({"buckets": buckets})
 
+    @app.get("/api/buckets/overview")
+    def buckets_overview():
+        # Served from cache; missing/stale buckets refresh in the background (poll again)
+        try:
+            return jsonify(get_overview(refresh=_flag("refresh")))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     def _ensure_allowed(bucket: str):
         allowed = set(get_allowed_buckets())
         if bucket not in allowed:
@@ -60,6 +172,49 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.get("/api/buckets/<bucket>/list-recursive")
+    def list_recursive(bucket):
+        if not _ensure_allowed(bucket):
+            return jsonify({"error": "Bucket not allowed"}), 400
+        prefix = request.args.get("prefix") or None
+        cursor = request.args.get("cursor") or None
+        limit = request.args.get("limit", default=MAX_RECURSIVE_OBJECTS, type=int)
+        limit = max(1, min(limit, MAX_RECURSIVE_OBJECTS))
+        stream = iter_objects_recursive(bucket=bucket, prefix=prefix, start_after=cursor)
+        try:
+            # Pull the first object eagerly so routing/listing errors still come back as JSON
+            first = next(stream, None)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        def ndjson():
+            # One object per line, then a trailer line {"done", "cursor", "count"};
+            # pass the cursor back to continue after the last key sent.
+            count = 0
+            last = cursor
+            lines = []
+            trailer = {"done": True}
+            try:
+                for obj in chain([first] if first else [], stream):
+                    if count >= limit:
+                        trailer = {"done": False}
+                        break
+                    lines.append(json.dumps(obj, separators=(",", ":")))
+                    count += 1
+                    last = obj["key"]
+                    if len(lines) >= 1000:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+            except Exception as e:
+                trailer = {"done": False, "error": str(e)}
+            finally:
+                stream.close()
+            trailer.update({"cursor": last, "count": count})
+            lines.append(json.dumps(trailer, separators=(",", ":")))
+            yield "\n".join(lines) + "\n"
+
+        return Response(stream_with_context(ndjson()), mimetype="application/x-ndjson")
+
     @app.post("/api/buckets/<bucket>/delete-all")
     def delete_all(bucket):
         if not _ensure_allowed(bucket):
@@ -97,6 +252,18 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.get("/api/buckets/<bucket>/smart-cleanup-estimate")
+    def smart_cleanup_estimate(bucket):
+        if not _ensure_allowed(bucket):
+            return jsonify({"error": "Bucket not allowed"}), 400
+        prefix = request.args.get("prefix") or None
+        probes = request.args.get("probes", default=16, type=int)
+        try:
+            result = estimate_smart_cleanup(bucket=bucket, prefix=prefix, probes=max(1, min(probes, 64)))
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     @app.post("/api/buckets/<bucket>/delete-keys")
     def delete_keys_route(bucket):
         if not _ensure_allowed(bucket):
@@ -175,17 +342,44 @@ def create_app():
         disposition = request.args.get("disposition", default="attachment")
         try:
             s3 = client_for_bucket(bucket)
-            filename = key.split("/")[-1] or "download"
-            params = {
-                "Bucket": bucket,
-                "Key": key,
-                "ResponseContentDisposition": f"{disposition}; filename=\"{filename}\"",
-            }
-            url = s3.generate_presigned_url("get_object", Params=params, ExpiresIn=300)
+            url = presign_get_url(s3, bucket, key, disposition=disposition)
             return redirect(url, code=302)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.post("/api/buckets/<bucket>/presign")
+    def presign_route(bucket):
+        if not _ensure_allowed(bucket):
+            return jsonify({"error": "Bucket not allowed"}), 400
+        try:
+            payload = request.get_json(force=True, silent=True) or {}
+            keys = payload.get("keys") or []
+            if not isinstance(keys, list) or not all(isinstance(k, str) and k for k in keys):
+                return jsonify({"error": "Invalid or missing 'keys' list"}), 400
+            if len(keys) > MAX_PRESIGN_KEYS:
+                return jsonify({"error": f"Too many keys (max {MAX_PRESIGN_KEYS})"}), 400
+            disposition = payload.get("disposition") or "attachment"
+            result = presign_keys(bucket=bucket, keys=keys, disposition=disposition)
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.get("/api/buckets/<bucket>/download-zip")
+    def download_zip(bucket):
+        if not _ensure_allowed(bucket):
+            return jsonify({"error": "Bucket not allowed"}), 400
+        prefix = request.args.get("prefix") or None
+        name = (prefix or "").rstrip("/").split("/")[-1] or bucket
+        stream = iter_prefix_zip(bucket=bucket, prefix=prefix)
+        try:
+            # Pull the first chunk eagerly so routing/listing errors still come back as JSON
+            first = next(stream)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        resp = Response(stream_with_context(chain([first], stream)), mimetype="application/zip")
+        _set_attachment(resp, f"{name}.zip")
+        return resp
+
     return app
 
 
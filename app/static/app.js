@@ -254,13 +254,15 @@ async function loadBuckets() {
           card.className = 'bucket-card';
           card.setAttribute('role', 'button');
           card.setAttribute('tabindex', '0');
-          card.innerHTML = `<div class="icon">🪣</div><div class="name">${b}</div>`;
+          card.dataset.bucket = b;
+          card.innerHTML = `<div class="icon">🪣</div><div class="info"><div class="name">${b}</div><div class="stats muted"></div></div>`;
           card.onclick = () => selectBucket(b);
           card.onkeydown = (e) => { if (e.key === 'Enter' || e.key === ' ') { e.preventDefault(); selectBucket(b); } };
           frag.appendChild(card);
         });
         bucketsGrid.innerHTML = '';
         bucketsGrid.appendChild(frag);
+        loadOverview();
       }
     }
   } finally {
@@ -268,6 +270,50 @@ async function loadBuckets() {
   }
 }
 
+// Landing card stats from the cached overview; poll while some are still being computed
+const OVERVIEW_POLL_MS = 5000;
+let overviewTimer = null;
+
+function overviewLines(b) {
+  if (b.status === 'pending') return ['Computing stats…'];
+  if (b.status === 'error') return [`Unreachable: ${b.error}`];
+  const lines = [`${b.objects} files · ${fmtBytes(b.bytes)}`];
+  if (b.newest) lines.push(`Newest: ${formatRelativeTime(b.newest.last_modified)} · oldest: ${formatRelativeTime(b.oldest.last_modified)}`);
+  if (b.reclaimable_bytes) lines.push(`Reclaimable: ${fmtBytes(b.reclaimable_bytes)}`);
+  if (b.endpoint) lines.push(b.endpoint.replace(/^https?:\/\//, ''));
+  return lines;
+}
+
+async function loadOverview() {
+  if (overviewTimer) { clearTimeout(overviewTimer); overviewTimer = null; }
+  if (!bucketsGrid) return;
+  let data;
+  try {
+    const res = await fetch('/api/buckets/overview');
+    data = await res.json();
+  } catch (_) {
+    return;
+  }
+  if (!data || !Array.isArray(data.buckets)) return;
+  let busy = false;
+  for (const b of data.buckets) {
+    if (b.status === 'pending' || b.refreshing) busy = true;
+    const card = [...bucketsGrid.querySelectorAll('.bucket-card')].find(c => c.dataset.bucket === b.bucket);
+    const el = card && card.querySelector('.stats');
+    if (!el) continue;
+    el.classList.toggle('error', b.status === 'error');
+    el.replaceChildren(...overviewLines(b).map(text => {
+      const line = document.createElement('div');
+      line.textContent = text;
+      return line;
+    }));
+    if (b.newest) el.title = `Newest: ${b.newest.key}\nOldest: ${b.oldest.key}`;
+  }
+  if (busy && landingEl && !landingEl.classList.contains('hidden')) {
+    overviewTimer = setTimeout(loadOverview, OVERVIEW_POLL_MS);
+  }
+}
+
 function renderBreadcrumbs() {
   const parts = state.prefix ? state.prefix.split('/').filter(Boolean) : [];
   // Show the bucket name as the root breadcrumb
@@ -320,10 +366,17 @@ async function loadListing(token) {
       const name = f.replace(state.prefix, '').replace(/\/$/, '');
       const tr = document.createElement('tr');
       tr.setAttribute('data-prefix', f);
-      tr.innerHTML = `<td class="name-cell"><span class="link">📁 ${name}</span></td><td></td><td></td><td class="row-actions"><button class="del-btn" data-prefix="${encodeURIComponent(f)}" title="Delete this folder (prefix)" aria-label="Delete folder">🗑️</button></td>`;
+      tr.innerHTML = `<td class="name-cell"><span class="link">📁 ${name}</span></td><td></td><td></td><td class="row-actions"><button class="zip-btn" title="Download folder as ZIP" aria-label="Download folder as ZIP">⬇️</button><button class="del-btn" data-prefix="${encodeURIComponent(f)}" title="Delete this folder (prefix)" aria-label="Delete folder">🗑️</button></td>`;
       tr.querySelector('.link').onclick = () => {
         state.prefix = f; state.tokenStack = []; state.nextToken = null; updateURL(); loadListing();
       };
+      const zipBtn = tr.querySelector('.zip-btn');
+      zipBtn.onclick = (e) => {
+        e.stopPropagation();
+        const zp = new URLSearchParams({ prefix: f });
+        // Streamed by the server; the browser handles it as a regular download
+        window.open(`/api/buckets/${encodeURIComponent(state.bucket)}/download-zip?${zp.toString()}`, '_blank', 'noopener');
+      };
       const fdel = tr.querySelector('.del-btn');
       fdel.onclick = async (e) => {
         e.stopPropagation();
@@ -486,6 +539,7 @@ function goHome() {
   if (previewModal && !previewModal.classList.contains('hidden')) hidePreviewModal();
   setStatus('');
   stopListingAutoRefresh();
+  loadOverview();
   history.pushState({}, '', '/');
   closeSidebar();
 }
@@ -530,43 +584,99 @@ btnDeleteAll.onclick = async () => {
   }
 };
 
-// Collect all objects recursively by traversing folders using the listing API
+// Collect all objects under a prefix from the server-side recursive listing.
+// The response is NDJSON: one object per line, then a trailer {done, cursor, count};
+// the cursor (last key received) resumes a capped response or a dropped connection.
 async function collectAllObjects(bucket, prefix) {
   const out = [];
-  const seen = new Set();
-  const queue = [prefix || ''];
-  while (queue.length) {
-    const cur = queue.shift();
-    let token = null;
-    let pages = 0; // safety
-    while (true) {
-      const params = new URLSearchParams();
-      if (cur) params.set('prefix', cur);
-      if (token) params.set('token', token);
-      const res = await fetch(`/api/buckets/${encodeURIComponent(bucket)}/list?${params.toString()}`);
-      const data = await res.json();
-      if (data.error) throw new Error(data.error);
-      if (Array.isArray(data.objects)) out.push(...data.objects);
-      if (Array.isArray(data.folders)) {
-        for (const f of data.folders) {
-          if (!seen.has(f)) { seen.add(f); queue.push(f); }
+  let cursor = null;
+  let retries = 0;
+  while (true) {
+    const params = new URLSearchParams();
+    if (prefix) params.set('prefix', prefix);
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`/api/buckets/${encodeURIComponent(bucket)}/list-recursive?${params.toString()}`);
+    if (!res.ok) {
+      const data = await res.json().catch(() => ({}));
+      throw new Error(data.error || `HTTP ${res.status}`);
+    }
+    let trailer = null;
+    try {
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buf = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (value) buf += decoder.decode(value, { stream: true });
+        let nl;
+        while ((nl = buf.indexOf('\n')) >= 0) {
+          const line = buf.slice(0, nl);
+          buf = buf.slice(nl + 1);
+          if (!line) continue;
+          const item = JSON.parse(line);
+          if ('done' in item) {
+            trailer = item;
+          } else {
+            out.push(item);
+            cursor = item.key;
+          }
         }
+        if (done) break;
       }
-      token = data.next_token || null;
-      pages += 1;
-      if (!token || pages > 100000) break;
+    } catch (e) {
+      trailer = null; // connection dropped mid-stream; retry from the last key received
+    }
+    if (trailer && trailer.error) throw new Error(trailer.error);
+    if (!trailer) {
+      retries += 1;
+      if (retries > 3) throw new Error('Listing interrupted');
+      continue;
     }
+    retries = 0;
+    if (trailer.done) return out;
+    cursor = trailer.cursor;
+    setStatus(`Listing... ${out.length} files so far`);
   }
-  return out;
+}
+
+// Format an estimate block ({estimate, low, high}) for display
+function fmtEstimate(est, fmt = (v) => String(v)) {
+  if (!est) return '';
+  if (est.low === est.high) return fmt(est.estimate);
+  // high is null when part of the prefix could not be bounded from above
+  if (est.high === null) return `~${fmt(est.estimate)} (at least ${fmt(est.low)})`;
+  return `~${fmt(est.estimate)} (${fmt(est.low)}–${fmt(est.high)})`;
+}
+
+// Quick sampled estimate shown before the (potentially slow) exact preview
+async function confirmSmartEstimate(params) {
+  setStatus('Estimating smart cleanup impact...');
+  let est;
+  try {
+    const res = await fetch(`/api/buckets/${encodeURIComponent(state.bucket)}/smart-cleanup-estimate?${params.toString()}`);
+    est = await res.json();
+  } catch (e) {
+    // Network errors or an HTML error page (502/504): the exact preview still works
+    est = { error: e.message || 'request failed' };
+  }
+  if (est.error) { setStatus(`Estimate unavailable: ${est.error}`, true); return true; }
+  const kind = est.mode === 'exact' ? 'Exact' : 'Estimated (likely range)';
+  const msg = `${kind} impact:\n\n` +
+    `Objects: ${fmtEstimate(est.objects)} (${fmtEstimate(est.bytes, fmtBytes)})\n` +
+    `To delete: ${fmtEstimate(est.to_delete)} (${fmtEstimate(est.to_delete_bytes, fmtBytes)})\n\n` +
+    'Compute the exact preview now?';
+  setStatus(`${kind}: ${fmtEstimate(est.to_delete)} files / ${fmtEstimate(est.to_delete_bytes, fmtBytes)} to delete`);
+  return confirm(msg);
 }
 
 btnSmartCleanup.onclick = async () => {
   if (!state.bucket) return;
+  const params = new URLSearchParams();
+  if (state.prefix) params.set('prefix', state.prefix);
+  if (!(await confirmSmartEstimate(params))) return;
   setStatus('Preparing smart cleanup preview...');
   listingOverlay && listingOverlay.classList.remove('hidden');
   try {
-    const params = new URLSearchParams();
-    if (state.prefix) params.set('prefix', state.prefix);
     const res = await fetch(`/api/buckets/${encodeURIComponent(state.bucket)}/smart-cleanup-preview?${params.toString()}`);
     const data = await res.json();
     if (data.error) { setStatus(`Error: ${data.error}`, true); return; }
@@ -989,6 +1099,7 @@ window.addEventListener('popstate', (ev) => {
     if (landingEl) landingEl.classList.remove('hidden');
     if (listingEl) listingEl.classList.add('hidden');
     stopListingAutoRefresh();
+    loadOverview();
   }
 });
 
@@ -0,0 +1,45 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Per-request phase durations in milliseconds. Kept in a ContextVar so the
+# S3 helpers can record phases without threading a timer through every call;
+# outside a request (scripts, shell) nothing is collected.
+_timings: contextvars.ContextVar = contextvars.ContextVar("timings", default=None)
+
+
+def start() -> None:
+    """Begin collecting phase timings for the current request."""
+    _timings.set({})
+
+
+def stop() -> Optional[Dict[str, float]]:
+    """Stop collecting and return the phases recorded so far."""
+    t = _timings.get()
+    _timings.set(None)
+    return t
+
+
+def add(name: str, ms: float) -> None:
+    t = _timings.get()
+    if t is not None:
+        t[name] = t.get(name, 0.0) + ms
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the wall time of the block to phase `name` (accumulates on repeat)."""
+    if _timings.get() is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format phases as a Server-Timing header value (names must be tokens)."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
@@ -0,0 +1,119 @@
+"""Benchmark the retention engine against the previous per-object implementation.
+
+Usage: python bench/bench_retention.py [--objects 1000000] [--days 1500]
+
+Builds a synthetic listing with random timestamps spread over --days, runs the
+legacy dict/strftime loop, the array engine with NumPy (when installed) and the
+pure-Python fallback, checks that all of them delete the same keys with the same
+tier/bucket labels, and prints the timings.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import retention  # noqa: E402
+
+
+def legacy_tier_and_bucket(dt, now):
+    days = (now - dt).total_seconds() / 86400
+    if days < 7:
+        return ("hourly", dt.replace(minute=0, second=0, microsecond=0).strftime("%Y-%m-%dT%H:00Z"))
+    elif days < 30:
+        return ("daily", dt.date().strftime("%Y-%m-%d"))
+    elif days < 90:
+        iso_year, iso_week, _ = dt.isocalendar()
+        return ("weekly", f"{iso_year}-W{iso_week:02d}")
+    elif days < 365:
+        iso_year, iso_week, _ = dt.isocalendar()
+        return ("biweekly", f"{iso_year}-BW{(iso_week - 1) // 2 + 1:02d}")
+    return ("monthly", dt.strftime("%Y-%m"))
+
+
+def legacy(rows, now):
+    objects = [{"key": k, "last_modified": lm, "size": s} for k, lm, s in rows]
+    t0 = time.perf_counter()
+    objects.sort(key=lambda x: x["last_modified"])
+    keep_by_bucket = {}
+    for idx, item in enumerate(objects):
+        tier, bid = legacy_tier_and_bucket(item["last_modified"], now)
+        k = f"{tier}:{bid}"
+        prev = keep_by_bucket.get(k)
+        if prev is None or item["last_modified"] > objects[prev]["last_modified"]:
+            keep_by_bucket[k] = idx
+    keep_idx = set(keep_by_bucket.values())
+    core = time.perf_counter() - t0
+    out = []
+    for i, o in enumerate(objects):
+        if i not in keep_idx:
+            tier, bid = legacy_tier_and_bucket(o["last_modified"], now)
+            out.append((o["key"], o["last_modified"].replace(microsecond=0).isoformat(), tier, bid))
+    return out, core
+
+
+def engine(rows, now):
+    batch = retention.ObjectBatch()
+    for k, lm, s in rows:
+        batch.append(k, lm, s)
+    t0 = time.perf_counter()
+    order = retention.time_order(batch.ts)
+    plan = retention.RetentionPlan(batch.ts, now)
+    to_delete = plan.to_delete(order)
+    core = time.perf_counter() - t0
+    labels = plan.labels(to_delete)
+    times = retention.iso_seconds(batch.ts, to_delete)
+    out = [(key, lm, tier, bid) for key, lm, (tier, bid) in zip(batch.keys(to_delete), times, labels)]
+    return out, core
+
+
+def run(fn, rows, now):
+    t0 = time.perf_counter()
+    out, core = fn(rows, now)
+    return out, core, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    span = args.days * 86400
+    # Listing order is key order, not time order
+    rows = [
+        (f"backups/db-{i:08d}.sql.gz", now - timedelta(seconds=rng.uniform(0, span)), rng.randint(1, 10**9))
+        for i in range(args.objects)
+    ]
+
+    print(f"{args.objects} objects over {args.days} days")
+    print("  core = sort + tier/slot assignment + newest-per-slot; total adds ingest and candidate rows")
+    expected, core_legacy, total_legacy = run(legacy, rows, now)
+    print(f"  {'legacy per-object loop':<22} core {core_legacy:7.2f} s   total {total_legacy:7.2f} s   ({len(expected)} to delete)")
+
+    ok = True
+    np_mod = retention.np
+    variants = [("engine, numpy", np_mod)] if np_mod is not None else []
+    variants.append(("engine, pure python", None))
+    for name, mod in variants:
+        retention.np = mod
+        retention.slot_label.cache_clear()
+        got, core, total = run(engine, rows, now)
+        ok = ok and got == expected
+        status = "identical" if got == expected else "MISMATCH"
+        print(
+            f"  {name:<22} core {core:7.2f} s {core_legacy / core:5.1f}x"
+            f"   total {total:7.2f} s {total_legacy / total:5.1f}x   {status}"
+        )
+    retention.np = np_mod
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Check the smart cleanup estimate against the exact preview on synthetic listings.
+
+Usage: python bench/check_estimate.py [--layouts 30] [--seed 1] [--probes 16]
+
+Builds random key layouts (one or many timestamped backup series, date folders,
+hashed names, plain counters, mixed prefixes) in an in-memory S3 stand-in, runs
+estimate_smart_cleanup and smart_cleanup(dry_run=True) on each, and prints the
+estimate, its bounds, the exact values and the number of listing requests.
+Exits 1 when an exact value falls outside the reported bounds (an open upper
+bound only has to hold from below).
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# Each layout reuses the same bucket and prefix, so cached plans must not leak between them
+os.environ["CACHE_ENABLED"] = "0"
+
+from app import s3_utils  # noqa: E402
+
+
+class FakeS3:
+    """The list_objects_v2 subset the estimate and the preview use."""
+
+    def __init__(self, objects):
+        self.objects = objects  # key -> (last_modified, size)
+        self.keys = sorted(objects)
+        self.requests = 0
+
+    def head_bucket(self, Bucket):
+        pass
+
+    def list_objects_v2(self, Bucket, Prefix="", StartAfter="", MaxKeys=1000, ContinuationToken=None, Delimiter=None):
+        self.requests += 1
+        after = max(StartAfter or "", ContinuationToken or "")
+        i = bisect.bisect_right(self.keys, after) if after else 0
+        i = max(i, bisect.bisect_left(self.keys, Prefix))
+        page, folders = [], []
+        while i < len(self.keys) and len(page) + len(folders) < MaxKeys and self.keys[i].startswith(Prefix):
+            key = self.keys[i]
+            cut = key.find(Delimiter, len(Prefix)) if Delimiter else -1
+            if cut < 0:
+                page.append(key)
+                i += 1
+            else:
+                # Roll the whole folder up into one common prefix
+                folders.append(key[: cut + 1])
+                i = bisect.bisect_right(self.keys, key[: cut + 1] + "\U0010ffff")
+        more = i < len(self.keys) and self.keys[i].startswith(Prefix)
+        resp = {
+            "Contents": [{"Key": k, "LastModified": self.objects[k][0], "Size": self.objects[k][1]} for k in page],
+            "CommonPrefixes": [{"Prefix": f} for f in folders],
+            "IsTruncated": more,
+        }
+        if more:
+            resp["NextContinuationToken"] = self.keys[i - 1]
+        return resp
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix=""):
+        token = None
+        while True:
+            resp = self.list_objects_v2(Bucket=Bucket, Prefix=Prefix, ContinuationToken=token)
+            yield resp
+            if not resp["IsTruncated"]:
+                return
+            token = resp["NextContinuationToken"]
+
+
+def _series(rng, objects, now, name, days, step, fmt, size):
+    """One backup series: an object every `step` (with jitter) over the last `days`."""
+    t = now - timedelta(days=days)
+    while t < now:
+        t = t.replace(microsecond=0)
+        objects[name + t.strftime(fmt)] = (t, max(1, int(rng.gauss(size, size / 10))))
+        t += step * rng.uniform(0.8, 1.2)
+
+
+def _layout(rng, now):
+    kind = rng.choice(["series", "many-series", "date-folders", "hashed", "numbered", "counters", "mixed"])
+    objects = {}
+    if kind == "series":
+        step = timedelta(minutes=rng.choice([15, 60, 240, 1440]))
+        # From a few listing pages (read in full) to large sampled ones
+        days = rng.choice([rng.randint(2, 90), rng.randint(20, 900)])
+        _series(rng, objects, now, "p/backup-", days, step, "%Y%m%dT%H%M%S.tar.gz", 10**6)
+    elif kind == "many-series":
+        # Series in sibling folders, in one flat folder, or in more folders than are sampled one by one
+        sep, count = rng.choice([("/", rng.randint(2, 12)), ("-", rng.randint(2, 6)), ("/", rng.randint(33, 40))])
+        step = timedelta(hours=rng.choice([1, 2, 6]))
+        days = rng.randint(60, 500) if count < 33 else rng.randint(20, 60)
+        for n in range(count):
+            _series(rng, objects, now, f"p/db{n}{sep}dump-", days * rng.uniform(0.5, 1), step, "%Y%m%d%H%M%S", 10**5)
+    elif kind == "date-folders":
+        for name in rng.sample(["pg-main", "pg-replica", "mysql", "redis"], rng.randint(1, 4)):
+            step = timedelta(minutes=rng.choice([30, 60, 180]))
+            _series(rng, objects, now, f"p/{name}/", rng.randint(30, 900), step, "%Y/%m/%d/dump-%H%M.sql", 10**5)
+    elif kind == "hashed":
+        span = rng.randint(10, 600) * 86400
+        for _ in range(rng.randint(2000, 60000)):
+            t = (now - timedelta(seconds=rng.uniform(0, span))).replace(microsecond=0)
+            objects[f"p/{uuid.UUID(int=rng.getrandbits(128))}"] = (t, rng.randint(1, 10**6))
+    elif kind == "numbered":
+        # Key order runs against time
+        step = rng.choice([600, 3600, 7200])
+        for i in range(rng.randint(1500, 40000)):
+            t = (now - timedelta(seconds=i * step)).replace(microsecond=0)
+            objects[f"p/{i:07d}.bin"] = (t, rng.randint(1, 10**6))
+    elif kind == "counters":
+        # Plain counters: padded and newest first, or unpadded (dump-1, dump-10, dump-100, ...)
+        # and oldest first; a few pages up to well past the exact listing
+        step = rng.choice([600, 3600, 86400])
+        count = rng.choice([rng.randint(1001, 8000), rng.randint(8001, 30000)])
+        padded = rng.random() < 0.5
+        for i in range(count):
+            if padded:
+                t, key = now - timedelta(seconds=i * step), f"p/x/{i:04d}.txt"
+            else:
+                t, key = now - timedelta(seconds=(count - i) * step), f"p/x/dump-{i + 1}.sql"
+            objects[key] = (t.replace(microsecond=0), rng.randint(1, 10**6))
+    else:
+        _series(rng, objects, now, "p/app/", rng.randint(30, 400), timedelta(hours=1), "%Y-%m-%dT%H%M.log", 10**4)
+        for _ in range(rng.randint(500, 5000)):
+            t = (now - timedelta(seconds=rng.uniform(0, 90 * 86400))).replace(microsecond=0)
+            objects[f"p/cache/{uuid.UUID(int=rng.getrandbits(128)).hex}"] = (t, rng.randint(1, 10**5))
+        _series(rng, objects, now, "p/db/", rng.randint(30, 400), timedelta(hours=6), "%Y%m%d-%H.sql", 10**6)
+    return kind, objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--layouts", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--probes", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    misses = 0
+    for n in range(args.layouts):
+        kind, objects = _layout(rng, now)
+        fake = FakeS3(objects)
+        s3_utils.get_s3_clients = lambda: [fake]
+        est = s3_utils.estimate_smart_cleanup("b", "p/", probes=args.probes)
+        requests = fake.requests
+        exact = s3_utils.smart_cleanup("b", "p/", dry_run=True)
+        truth = {
+            "objects": exact["scanned"],
+            "to_delete": exact["to_delete"],
+            "to_delete_bytes": sum(c["size"] for c in exact["candidates"]),
+        }
+        line = [f"{n:3d} {kind:<13} {requests:4d} req"]
+        for name, value in truth.items():
+            b = est[name]
+            # high is None when the estimate could not bound the range from above
+            ok = b["low"] <= value and (b["high"] is None or value <= b["high"])
+            misses += not ok
+            high = "open" if b["high"] is None else b["high"]
+            line.append(f"{name} {b['estimate']:>9} [{b['low']}-{high}] exact {value}{'' if ok else ' MISS'}")
+        print("  ".join(line))
+    print(f"{misses} exact values outside the bounds")
+    sys.exit(1 if misses else 0)
+
+
+if __name__ == "__main__":
+    main()